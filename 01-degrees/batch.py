@@ -0,0 +1,231 @@
+"""
+Batch mode for degrees: answers many separation queries in one run.
+
+Reads one query per line from a file or stdin, as two people given by
+IMDB id or by an unambiguous name separated by a comma or a tab, and
+writes one JSON object per query to stdout in input order.
+
+With --distances only hop counts are reported, and queries are grouped
+so that up to WORD_SIZE sources share one bit-parallel search.
+
+The graph is loaded once before the worker pool is started. Workers are
+forked so they inherit it, and with a snapshot its arrays are memory-mapped
+pages shared by every process; nothing is pickled to the workers except
+the queries themselves.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+from graph import WORD_SIZE
+
+# Number of queries grouped into one task in --distances mode
+GROUP_SIZE = 4096
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer degrees of separation queries in batch."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file with one query per line, - for stdin")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes")
+    parser.add_argument("--distances", action="store_true",
+                        help="report hop counts only, without paths")
+    args = parser.parse_args()
+
+    degrees.load_data(args.directory)
+
+    if args.queries == "-":
+        run(sys.stdin, sys.stdout, args.directory, args.workers,
+            args.distances)
+    else:
+        with open(args.queries, encoding="utf-8") as f:
+            run(f, sys.stdout, args.directory, args.workers,
+                args.distances)
+
+
+def run(lines, out, directory, workers=None, distances=False):
+    """
+    Answers every query in `lines` on a process pool,
+    writing JSON lines to `out` as results come back.
+    """
+    queries = read_queries(lines)
+    if distances:
+        tasks, function, chunksize = groups(queries), answer_group, 1
+    else:
+        tasks, function, chunksize = queries, answer, 64
+
+    if workers == 1:
+        results = map(function, tasks)
+        write_results(results, out, distances)
+        return
+
+    with pool_context().Pool(workers, initializer=init_worker,
+                             initargs=(directory,)) as pool:
+        results = pool.imap(function, tasks, chunksize=chunksize)
+        write_results(results, out, distances)
+
+
+def write_results(results, out, grouped):
+    """
+    Writes the JSON lines in `results` to `out`,
+    flattening them first if they come in groups.
+    """
+    if grouped:
+        results = itertools.chain.from_iterable(results)
+    for result in results:
+        out.write(result + "\n")
+
+
+def pool_context():
+    """
+    Returns a multiprocessing context that forks where the platform
+    allows it, so that workers inherit the loaded graph.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def init_worker(directory):
+    """
+    Loads the graph in a worker that did not inherit it.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory)
+
+
+def read_queries(lines):
+    """
+    Yields (source, target) pairs from comma or tab separated lines,
+    skipping blank lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        delimiter = "\t" if "\t" in line else ","
+        row = next(csv.reader([line], delimiter=delimiter))
+        if len(row) != 2:
+            yield line, None
+        else:
+            yield row[0].strip(), row[1].strip()
+
+
+def groups(queries):
+    """
+    Yields the queries in lists of at most GROUP_SIZE.
+    """
+    queries = iter(queries)
+    while True:
+        group = list(itertools.islice(queries, GROUP_SIZE))
+        if not group:
+            return
+        yield group
+
+
+def resolve(person):
+    """
+    Returns the person index for an IMDB id or an unambiguous name,
+    or None if there is no such person.
+    """
+    graph = degrees.graph
+    if person in graph.person_index:
+        return graph.person_index[person]
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return graph.person_index[next(iter(person_ids))]
+    return None
+
+
+def answer(query):
+    """
+    Returns the JSON line answering one (source, target) query.
+    """
+    return json.dumps(solve(query))
+
+
+def solve(query):
+    """
+    Returns a dictionary answering one (source, target) query.
+    """
+    graph = degrees.graph
+    source, target = query
+    result = {"source": source, "target": target}
+    if target is None:
+        result["error"] = "malformed query"
+        return result
+
+    source_index = resolve(source)
+    target_index = resolve(target)
+    if source_index is None or target_index is None:
+        result["error"] = "person not found"
+        return result
+
+    path, stats = graph.search(source_index, target_index)
+    result["source"] = graph.person_ids[source_index]
+    result["target"] = graph.person_ids[target_index]
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [list(step) for step in graph.path_ids(path)]
+    result["explored"] = stats.explored
+    result["stats"] = stats.as_dict()
+    return result
+
+
+def answer_group(queries):
+    """
+    Returns the JSON lines answering a list of (source, target) queries
+    with hop counts only, sharing one bit-parallel search between up to
+    WORD_SIZE distinct sources.
+    """
+    graph = degrees.graph
+    results = []
+    resolved = {}
+    for source, target in queries:
+        result = {"source": source, "target": target}
+        if target is None:
+            result["error"] = "malformed query"
+        else:
+            pair = resolve(source), resolve(target)
+            if None in pair:
+                result["error"] = "person not found"
+            else:
+                result["source"] = graph.person_ids[pair[0]]
+                result["target"] = graph.person_ids[pair[1]]
+                resolved[len(results)] = pair
+        results.append(result)
+
+    # Group the targets of each source, then search WORD_SIZE sources
+    # at a time
+    targets = {}
+    for source, target in resolved.values():
+        targets.setdefault(source, set()).add(target)
+    sources = list(targets)
+    distances = {}
+    for i in range(0, len(sources), WORD_SIZE):
+        chunk = sources[i:i + WORD_SIZE]
+        chunk_targets = set().union(*(targets[s] for s in chunk))
+        found = graph.multi_source_distances(chunk, chunk_targets)
+        for source, reached in zip(chunk, found):
+            distances[source] = reached
+
+    for i, (source, target) in resolved.items():
+        results[i]["degrees"] = distances[source].get(target)
+    return [json.dumps(result) for result in results]
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import csv
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import StarGraph, PeopleView, MoviesView
+from landmarks import load_landmarks
+from name_search import NameSearch
+from snapshot import (snapshot_key, snapshot_path, appended_rows,
+                      open_snapshot, write_snapshot)
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,56 +17,143 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed star graph backing `people` and `movies`
+graph = None
+
+# Directory and snapshot key of the loaded dataset
+data_directory = None
+data_key = None
+
+# Landmark distances for shortest_path_alt, loaded on first use
+landmarks = None
+
+# Prefix and approximate name index for find_people, built on first use
+name_search = None
+
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    The parsed data is saved to a snapshot next to the CSV files, and
+    later calls memory-map that snapshot instead of parsing the files
+    again for as long as their size and modification time are unchanged.
+    If rows were only appended to the files, just those rows are read and
+    applied to the snapshot, which is then saved again.
+    """
+    global graph, names, people, movies
+    global data_directory, data_key, landmarks, name_search
+
+    key = snapshot_key(directory)
+    path = snapshot_path(directory)
+    loaded = open_snapshot(path)
+    appended = None
+    if loaded is not None and loaded[2] != key:
+        appended = appended_rows(directory, loaded[2])
+        if appended is None:
+            loaded = None
+
+    if loaded is not None:
+        graph, names = loaded[:2]
+    else:
+        graph = StarGraph.from_csv(directory)
+        names = {}
+        add_names(range(len(graph.person_ids)))
+
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+    data_directory = directory
+    data_key = key
+    landmarks = None
+    name_search = None
+
+    if appended is not None:
+        apply_rows(appended["people.csv"], appended["movies.csv"],
+                   appended["stars.csv"])
+    if loaded is None or appended is not None:
+        try:
+            write_snapshot(path, graph, key, names)
+        except OSError:
+            pass
+
+
+def apply_delta(directory):
+    """
+    Adds the rows of the people.csv, movies.csv and stars.csv files in
+    `directory`, any of which may be missing, to the loaded data without
+    reloading it.
+
+    Returns a dictionary of: people and movies (lists of the new person
+    and movie indices) and stars (the number of new stars).
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global data_key
+
+    rows = {}
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        try:
+            with open(os.path.join(directory, filename),
+                      encoding="utf-8") as f:
+                rows[filename] = list(csv.DictReader(f))
+        except FileNotFoundError:
+            rows[filename] = []
+
+    added = apply_rows(rows["people.csv"], rows["movies.csv"],
+                       rows["stars.csv"])
+
+    # The loaded data no longer matches the files on disk, so nothing
+    # derived from it may be saved under their key
+    data_key = None
+    return added
+
+
+def apply_rows(people_rows, movie_rows, star_rows):
+    """
+    Adds people, movies and stars rows to the graph and updates the name
+    indices. Landmarks are dropped, since new people and stars can make
+    their distances wrong.
+    """
+    global landmarks
+
+    added = graph.apply_delta(people_rows, movie_rows, star_rows)
+    add_names(added["people"])
+    if name_search is not None:
+        for person in added["people"]:
+            name_search.add(person)
+    if added["people"] or added["stars"]:
+        landmarks = None
+    return added
+
+
+def add_names(persons):
+    """
+    Adds person indices of the graph to `names`.
+    """
+    for person in persons:
+        if isinstance(names, dict):
+            name = graph.person_names[person].lower()
+            names.setdefault(name, set()).add(graph.person_ids[person])
+        else:
+            names.add(person)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    components = "--components" in args
+    if components:
+        args.remove("--components")
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [directory] [--components]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
     load_data(directory)
     print("Data loaded.")
 
+    if components:
+        print_components()
+        return
+
     source = person_id_for_name(input("Name First Person: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +161,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, on_stats=print_stats)
 
     if path is None:
         print("Not connected.")
@@ -84,55 +176,110 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def print_components(limit=10):
+    """
+    Prints how many connected components there are
+    and the sizes of the largest ones.
+    """
+    sizes = graph.component_sizes()
+    print(f"{len(people)} people in {len(sizes)} components.")
+    for size, root in sizes[:limit]:
+        name = graph.person_names[root]
+        print(f"{size} people, including {name}")
+
+
+def print_stats(stats):
+    """
+    Prints the SearchStats of a search.
+    """
+    print('State Explored:', stats.explored)
+
+
+def shortest_path(source, target, on_stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If `on_stats` is given, it is called with the SearchStats
+    of the search.
     """
+    path, stats = graph.search(
+        graph.person_index[source], graph.person_index[target]
+    )
+    return finish_search(path, stats, on_stats)
+
 
-    # Init Vars
-    num_explored = 0
-    start = Node(source, None, None)
-    frontier = QueueFrontier()
-    frontier.add( start )
-    explored = set()
+def shortest_path_within(source, target, first_year=None, last_year=None,
+                         excluded=(), on_stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect
+    the source to the target using only movies released between
+    `first_year` and `last_year` inclusive, either of which may be None,
+    and none of the movie_ids in `excluded`.
 
-    while True:
+    If no possible path, returns None.
+    """
+    path, stats = graph.search(
+        graph.person_index[source], graph.person_index[target],
+        first_year, last_year,
+        [graph.movie_index[movie_id] for movie_id in excluded]
+    )
+    return finish_search(path, stats, on_stats)
+
+
+def finish_search(path, stats, on_stats):
+    """
+    Hands `stats` to the `on_stats` hook, if any, and returns the
+    path as (movie_id, person_id) pairs, or None.
+    """
+    if on_stats is not None:
+        on_stats(stats)
+    if path is None:
+        return None
+    return graph.path_ids(path)
 
-        if frontier.empty():
-            print('State Explored:', len(explored))
-            return None
 
-        node = frontier.remove()
-        num_explored += 1
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, one at a time.
+    """
+    for path in graph.all_shortest_paths(
+        graph.person_index[source], graph.person_index[target]
+    ):
+        yield graph.path_ids(path)
 
-        if node.state == target:
-            actions = []
-            cells = []
 
-            while node.parent is not None:
-                actions.append( node.action )
-                cells.append( node.state )
-                node = node.parent
-            actions.reverse()
-            cells.reverse()
+def k_shortest_paths(source, target, k):
+    """
+    Yields up to `k` lists of (movie_id, person_id) pairs that connect
+    the source to the target without visiting anyone twice,
+    shortest first.
+    """
+    for path in graph.k_shortest_paths(
+        graph.person_index[source], graph.person_index[target], k
+    ):
+        yield graph.path_ids(path)
 
-            array_to_return = []
-            for i in range( len(cells) ):
-                array_to_return.append( (actions[i], cells[i]) )
 
-            print('State Explored:', len(explored))
-            return array_to_return
+def shortest_path_alt(source, target, on_stats=None):
+    """
+    Returns the same result as `shortest_path`, found by A* search
+    guided by landmark distances instead of breadth-first search.
 
-        explored.add( node.state )
+    The landmarks are computed the first time they are needed and kept
+    next to the dataset for later runs.
+    """
+    global landmarks
 
-        # where action = movie and state = person
-        for action, state in neighbors_for_person(node.state):
-            if not frontier.contains_state(state) and state not in explored:
-                child = Node(state, node, action)
-                frontier.add(child)
+    if landmarks is None:
+        landmarks = load_landmarks(data_directory, graph, data_key)
+    path, stats = graph.alt_search(
+        graph.person_index[source], graph.person_index[target], landmarks
+    )
+    return finish_search(path, stats, on_stats)
 
 
 def person_id_for_name(name):
@@ -142,6 +289,12 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        candidates = find_people(name, 5)
+        if candidates:
+            print(f"No '{name}'. Did you mean:")
+            for candidate in candidates:
+                print(f"ID: {candidate['id']}, Name: {candidate['name']}, "
+                      f"Birth: {candidate['birth']}")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -161,17 +314,35 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def find_people(name, limit=10):
+    """
+    Returns up to `limit` people whose names match `name` exactly,
+    by prefix or approximately, best first. Each candidate is a
+    dictionary of: id, name, birth, movies (a count) and score.
+    """
+    return name_index().lookup(name, limit)
+
+
+def name_index():
+    """
+    Returns the prefix and approximate name index of the loaded data,
+    creating it on first use.
+    """
+    global name_search
+
+    if name_search is None:
+        name_search = NameSearch(graph, getattr(names, "order", None))
+    return name_search
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
-    neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
-    return neighbors
+    return set(graph.path_ids(
+        graph.neighbors(graph.person_index[person_id])
+    ))
 
 
 if __name__ == "__main__":
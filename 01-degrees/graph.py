@@ -0,0 +1,987 @@
+import csv
+import heapq
+import sys
+import time
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from itertools import accumulate
+from operator import sub
+
+
+class StarGraph():
+    """
+    Integer-indexed person/movie graph.
+
+    People and movies are numbered densely from 0. The incidence between
+    them is stored in CSR form: the movies of person `p` are
+    `person_movies[person_offsets[p]:person_offsets[p + 1]]` and the stars
+    of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    The movies of each person are sorted by year, and `person_movie_years`
+    holds the year of every entry of `person_movies` (0 if unknown), so
+    the movies of a person within a range of years can be found by
+    binary search.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_index=None, movie_index=None, components=None,
+                 person_movie_years=None):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+        if components is None:
+            components = find_components(len(person_ids), movie_offsets,
+                                         movie_people)
+        self.components = components
+        if person_movie_years is None:
+            person_movie_years = array("i", (
+                year_number(movie_years[movie]) for movie in person_movies
+            ))
+        self.person_movie_years = person_movie_years
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds the graph from the people, movies and stars CSV files
+        in `directory`.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Number movies in order of year, so that sorting each person's
+        # movies by index also sorts them by year
+        order = sorted(range(len(movie_ids)),
+                       key=lambda i: year_number(movie_years[i]))
+        movie_ids = [movie_ids[i] for i in order]
+        movie_titles = [movie_titles[i] for i in order]
+        movie_years = [movie_years[i] for i in order]
+
+        person_index = {
+            person_id: i for i, person_id in enumerate(person_ids)
+        }
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        # Encode each (person, movie) pair as one integer so duplicates
+        # collapse and the pairs come out sorted by person
+        num_movies = len(movie_ids)
+        edges = set()
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    p = person_index[row["person_id"]]
+                    m = movie_index[row["movie_id"]]
+                except KeyError:
+                    continue
+                edges.add(p * num_movies + m)
+        edges = sorted(edges)
+
+        person_offsets, person_movies = build_csr(
+            len(person_ids),
+            (edge // num_movies for edge in edges),
+            (edge % num_movies for edge in edges),
+            len(edges)
+        )
+        movie_offsets, movie_people = build_csr(
+            num_movies,
+            (edge % num_movies for edge in edges),
+            (edge // num_movies for edge in edges),
+            len(edges)
+        )
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_people)
+
+    def component(self, person):
+        """
+        Returns the representative person index of the connected
+        component of a person index.
+        """
+        components = self.components
+        while components[person] != person:
+            person = components[person]
+        return person
+
+    def connected(self, source, target):
+        """
+        Returns True if there is a path between two person indices.
+        """
+        return self.component(source) == self.component(target)
+
+    def component_sizes(self):
+        """
+        Returns a list of (size, representative person index) pairs,
+        one per connected component, largest first.
+        """
+        sizes = Counter(map(self.component, range(len(self.person_ids))))
+        return sorted(((size, root) for root, size in sizes.items()),
+                      reverse=True)
+
+    def apply_delta(self, people, movies, stars):
+        """
+        Adds rows shaped like those of people.csv, movies.csv and
+        stars.csv to the graph without rebuilding it, skipping ids that
+        are already known and stars that refer to unknown ids.
+
+        New people and movies are numbered after the existing ones, the
+        CSR arrays are merged with the new stars in one pass, and the
+        new stars are united into the existing components.
+
+        Returns a dictionary of: people and movies (lists of the new
+        indices) and stars (the number of new stars).
+        """
+        added_people = []
+        for row in people:
+            if row["id"] in self.person_index:
+                continue
+            added_people.append(len(self.person_ids))
+            self.person_ids.append(row["id"])
+            self.person_names.append(row["name"])
+            self.person_births.append(row["birth"])
+            self.person_index[row["id"]] = added_people[-1]
+
+        added_movies = []
+        for row in movies:
+            if row["id"] in self.movie_index:
+                continue
+            added_movies.append(len(self.movie_ids))
+            self.movie_ids.append(row["id"])
+            self.movie_titles.append(row["title"])
+            self.movie_years.append(row["year"])
+            self.movie_index[row["id"]] = added_movies[-1]
+
+        known_people = len(self.person_offsets) - 1
+        new_movies = {}
+        new_stars = {}
+        for row in stars:
+            try:
+                person = self.person_index[row["person_id"]]
+                movie = self.movie_index[row["movie_id"]]
+            except KeyError:
+                continue
+            if movie in new_movies.get(person, ()):
+                continue
+            if person < known_people and movie in self.movies_of(person):
+                continue
+            new_movies.setdefault(person, []).append(movie)
+            new_stars.setdefault(movie, []).append(person)
+
+        offsets = self.person_offsets
+        new_years = {
+            person: [year_number(self.movie_years[m]) for m in added]
+            for person, added in new_movies.items()
+        }
+        self.person_offsets, self.person_movies = merge_csr(
+            offsets, self.person_movies, new_movies, len(self.person_ids)
+        )
+        _, self.person_movie_years = merge_csr(
+            offsets, self.person_movie_years, new_years, len(self.person_ids)
+        )
+
+        # Keep the movies of each person sorted by year
+        po, pm = self.person_offsets, self.person_movies
+        years = self.person_movie_years
+        for person in new_movies:
+            start, end = po[person], po[person + 1]
+            entries = sorted(zip(years[start:end], pm[start:end]))
+            years[start:end] = array("i", (year for year, _ in entries))
+            pm[start:end] = array("i", (movie for _, movie in entries))
+        self.movie_offsets, self.movie_people = merge_csr(
+            self.movie_offsets, self.movie_people, new_stars,
+            len(self.movie_ids)
+        )
+
+        # Give each new person their own component, then link every
+        # new star to the first star of their movie
+        components = writable(self.components)
+        components.extend(range(len(components), len(self.person_ids)))
+        self.components = components
+        for movie, added in new_stars.items():
+            first = self.movie_people[self.movie_offsets[movie]]
+            for person in added:
+                union(components, first, person)
+
+        return {
+            "people": added_people,
+            "movies": added_movies,
+            "stars": sum(map(len, new_stars.values()))
+        }
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices of a person index.
+        """
+        start = self.person_offsets[person]
+        return self.person_movies[start:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices of the stars of a movie index.
+        """
+        start = self.movie_offsets[movie]
+        return self.movie_people[start:self.movie_offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with a given person index.
+        """
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        for i in range(po[person], po[person + 1]):
+            movie = pm[i]
+            for j in range(mo[movie], mo[movie + 1]):
+                yield movie, mp[j]
+
+    def search(self, source, target, first_year=None, last_year=None,
+               excluded=()):
+        """
+        Returns a pair (path, stats) where `path` is the shortest list
+        of (movie, person) index pairs connecting the source index to the
+        target index, or None if they are not connected, and `stats` is
+        the SearchStats of the search.
+
+        If `first_year` or `last_year` is given, only movies with a known
+        year in that range are used; each person's movies in range are
+        found by binary search over their movies sorted by year. Movie
+        indices in `excluded` are never used.
+
+        Runs a bidirectional breadth-first search, always expanding one
+        full level of the smaller frontier. Both sides share visited
+        marks with one bit per side, so the first person reached from
+        both sides closes a shortest path.
+
+        The graph is bipartite, so each side also marks the movies it has
+        expanded: once a movie's cast has been pushed, every other star of
+        that movie reaching it again is skipped without rescanning it.
+
+        The marks and parent links are kept in dictionaries, which only
+        grow with the people and movies the search reaches, so a short
+        search does not pay for buffers sized to the whole graph.
+        """
+        stats = SearchStats()
+        if source == target:
+            return [], stats.stop()
+        if not self.connected(source, target):
+            return None, stats.stop()
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+
+        seen = {source: FORWARD, target: BACKWARD}
+
+        # Excluded movies count as already expanded by both sides
+        expanded = dict.fromkeys(excluded, FORWARD | BACKWARD)
+        filtered = first_year is not None or last_year is not None
+        if filtered:
+            years = self.person_movie_years
+            first_year = max(first_year or 1, 1)
+            if last_year is None:
+                last_year = MAX_YEAR
+        forward_person, forward_movie = {}, {}
+        backward_person, backward_movie = {}, {}
+        forward = array("i", [source])
+        backward = array("i", [target])
+        parents = (forward_person, forward_movie,
+                   backward_person, backward_movie)
+
+        while forward and backward:
+            stats.frontier(len(forward) + len(backward))
+
+            # Expand the smaller side
+            if len(forward) <= len(backward):
+                frontier, side, other = forward, FORWARD, BACKWARD
+                parent_person, parent_movie = forward_person, forward_movie
+            else:
+                frontier, side, other = backward, BACKWARD, FORWARD
+                parent_person, parent_movie = backward_person, backward_movie
+
+            next_frontier = array("i")
+            for person in frontier:
+                stats.explored += 1
+                start, end = po[person], po[person + 1]
+                if filtered:
+                    start = bisect_left(years, first_year, start, end)
+                    end = bisect_right(years, last_year, start, end)
+                for i in range(start, end):
+                    movie = pm[i]
+                    done = expanded.get(movie, 0)
+                    if done & side:
+                        continue
+                    expanded[movie] = done | side
+                    stats.expansions += mo[movie + 1] - mo[movie]
+                    for j in range(mo[movie], mo[movie + 1]):
+                        neighbor = mp[j]
+                        mark = seen.get(neighbor, 0)
+                        if mark & side:
+                            continue
+                        seen[neighbor] = mark | side
+                        parent_person[neighbor] = person
+                        parent_movie[neighbor] = movie
+                        if mark & other:
+                            path = join_paths(neighbor, source, target,
+                                              *parents)
+                            stats.allocate(next_frontier, seen, expanded,
+                                           *parents)
+                            return path, stats.stop()
+                        next_frontier.append(neighbor)
+
+            stats.allocate(next_frontier)
+            if side == FORWARD:
+                forward = next_frontier
+            else:
+                backward = next_frontier
+
+        stats.allocate(seen, expanded, *parents)
+        return None, stats.stop()
+
+    def multi_source_distances(self, sources, targets, witnesses=False):
+        """
+        Returns a list with one dictionary per source, mapping every
+        target index reachable from that source to its hop count.
+
+        Runs a single bit-parallel breadth-first search for up to
+        WORD_SIZE sources at once: every person carries a bitmask of the
+        sources that have reached it and every level ORs those masks
+        through the movies, so all sources advance together.
+
+        If `witnesses` is true, also returns a second list of dictionaries
+        mapping each reached target to a shortest path of (movie, person)
+        index pairs from that source.
+        """
+        if len(sources) > WORD_SIZE:
+            raise ValueError(f"at most {WORD_SIZE} sources per search")
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        targets = set(targets)
+        distances = [{} for _ in sources]
+        parents = {} if witnesses else None
+
+        visited = [0] * len(self.person_ids)
+        expanded = [0] * len(self.movie_ids)
+        frontier = {}
+        for bit, source in enumerate(sources):
+            visited[source] |= 1 << bit
+            frontier[source] = frontier.get(source, 0) | 1 << bit
+            if source in targets:
+                distances[bit][source] = 0
+
+        # Number of connected (source, target) pairs still unanswered
+        components = Counter(map(self.component, targets))
+        pending = sum(components[self.component(source)]
+                      for source in sources) - sum(map(len, distances))
+
+        depth = 0
+        while frontier and pending:
+            depth += 1
+
+            # Push each person's mask through their movies, skipping
+            # sources that have already crossed a movie
+            movie_masks = {}
+            movie_parents = {}
+            for person, mask in frontier.items():
+                for i in range(po[person], po[person + 1]):
+                    movie = pm[i]
+                    new = mask & ~expanded[movie]
+                    if not new:
+                        continue
+                    expanded[movie] |= new
+                    movie_masks[movie] = movie_masks.get(movie, 0) | new
+                    if witnesses:
+                        for bit in bits(new):
+                            movie_parents[bit, movie] = person
+
+            # Hand every movie's mask on to its stars
+            next_frontier = {}
+            for movie, mask in movie_masks.items():
+                for j in range(mo[movie], mo[movie + 1]):
+                    person = mp[j]
+                    new = mask & ~visited[person]
+                    if not new:
+                        continue
+                    visited[person] |= new
+                    next_frontier[person] = next_frontier.get(person, 0) | new
+                    if witnesses:
+                        for bit in bits(new):
+                            parents[bit, person] = (
+                                movie, movie_parents[bit, movie]
+                            )
+                    if person in targets:
+                        for bit in bits(new):
+                            distances[bit][person] = depth
+                            pending -= 1
+            frontier = next_frontier
+
+        if not witnesses:
+            return distances
+
+        paths = []
+        for bit, source in enumerate(sources):
+            paths.append({})
+            for target in distances[bit]:
+                path = []
+                person = target
+                while person != source:
+                    movie, parent = parents[bit, person]
+                    path.append((movie, person))
+                    person = parent
+                path.reverse()
+                paths[bit][target] = path
+        return distances, paths
+
+    def distances_from(self, source):
+        """
+        Returns an array holding the hop count from the source index to
+        every person, with -1 for people it cannot reach.
+        """
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        distances = array("h", [-1]) * len(self.person_ids)
+        expanded = bytearray(len(self.movie_ids))
+        distances[source] = 0
+        frontier = array("i", [source])
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = array("i")
+            for person in frontier:
+                for i in range(po[person], po[person + 1]):
+                    movie = pm[i]
+                    if expanded[movie]:
+                        continue
+                    expanded[movie] = 1
+                    for j in range(mo[movie], mo[movie + 1]):
+                        neighbor = mp[j]
+                        if distances[neighbor] < 0:
+                            distances[neighbor] = depth
+                            next_frontier.append(neighbor)
+            frontier = next_frontier
+        return distances
+
+    def alt_search(self, source, target, landmarks):
+        """
+        Returns a pair (path, stats) like `search`, using A* with
+        landmark lower bounds (see `landmarks.Landmarks`) as heuristic.
+
+        The bounds never overestimate and are consistent, so the first
+        time the target is taken off the heap its path is a shortest one.
+        """
+        stats = SearchStats()
+        if source == target:
+            return [], stats.stop()
+        if not self.connected(source, target):
+            return None, stats.stop()
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        bound = landmarks.bound_to(target)
+
+        estimate = bound(source)
+        if estimate is None:
+            return None, stats.stop()
+
+        # Cost of the best path found to every person reached, and -1
+        # once they are taken off the heap
+        cost = {source: 0}
+        parents = {}
+        # Ties on the estimate go to the deeper person first
+        heap = [(estimate, 0, source)]
+
+        while heap:
+            stats.frontier(len(heap))
+            _, g, person = heapq.heappop(heap)
+            g = -g
+            if cost[person] < 0:
+                continue
+            cost[person] = -1
+            if person == target:
+                path = []
+                while person != source:
+                    movie, previous = parents[person]
+                    path.append((movie, person))
+                    person = previous
+                path.reverse()
+                stats.allocate(cost, parents)
+                return path, stats.stop()
+            stats.explored += 1
+
+            g += 1
+            for i in range(po[person], po[person + 1]):
+                movie = pm[i]
+                stats.expansions += mo[movie + 1] - mo[movie]
+                for j in range(mo[movie], mo[movie + 1]):
+                    neighbor = mp[j]
+                    if cost.get(neighbor, g + 1) <= g:
+                        continue
+                    estimate = bound(neighbor)
+                    if estimate is None:
+                        continue
+                    cost[neighbor] = g
+                    parents[neighbor] = (movie, person)
+                    heapq.heappush(heap, (g + estimate, -g, neighbor))
+
+        stats.allocate(cost, parents)
+        return None, stats.stop()
+
+    def all_shortest_paths(self, source, target):
+        """
+        Yields every shortest list of (movie, person) index pairs
+        connecting the source index to the target index, one at a time.
+
+        A breadth-first search from the source records the shortest-path
+        DAG compactly: for each person the movies that first reach them,
+        and for each movie the people one level closer to the source who
+        starred in it. Paths are then unfolded lazily from the target, so
+        only the path being yielded is held in memory however many
+        there are.
+        """
+        if source == target:
+            yield []
+            return
+        if not self.connected(source, target):
+            return
+
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        depth = {source: 0}
+        reached_by = {}
+        cast_before = {}
+        frontier = [source]
+        level = 0
+        while frontier and target not in depth:
+            level += 1
+
+            # A movie only matters on the level it is first touched:
+            # every later level already has its whole cast
+            movies = {}
+            for person in frontier:
+                for i in range(po[person], po[person + 1]):
+                    movie = pm[i]
+                    if movie in cast_before:
+                        continue
+                    movies.setdefault(movie, []).append(person)
+
+            next_frontier = []
+            for movie, cast in movies.items():
+                cast_before[movie] = cast
+                for j in range(mo[movie], mo[movie + 1]):
+                    person = mp[j]
+                    if person not in depth:
+                        depth[person] = level
+                        next_frontier.append(person)
+                    if depth[person] == level:
+                        reached_by.setdefault(person, []).append(movie)
+            frontier = next_frontier
+
+        if target not in depth:
+            return
+
+        def unfold(person):
+            if person == source:
+                yield []
+                return
+            for movie in reached_by[person]:
+                for previous in cast_before[movie]:
+                    for path in unfold(previous):
+                        path.append((movie, person))
+                        yield path
+
+        yield from unfold(target)
+
+    def k_shortest_paths(self, source, target, k):
+        """
+        Yields up to `k` loopless lists of (movie, person) index pairs
+        connecting the source index to the target index, shortest first,
+        using Yen's algorithm. Paths through different movies count as
+        different paths.
+        """
+        path, _ = self.search(source, target)
+        if path is None or k < 1:
+            return
+        found = [path]
+        yield path
+        candidates = []
+        queued = set()
+        counter = 0
+
+        while len(found) < k:
+            last = [(None, source)] + found[-1]
+
+            # Deviate from the last path at each of its people in turn
+            for i in range(len(last) - 1):
+                spur = last[i][1]
+                root = found[-1][:i]
+                blocked_steps = {
+                    path[i] for path in found
+                    if len(path) > i and path[:i] == root
+                }
+                blocked_people = {person for _, person in last[:i]}
+                spur_path = self.restricted_path(
+                    spur, target, blocked_people, blocked_steps
+                )
+                if spur_path is None:
+                    continue
+                candidate = root + spur_path
+                key = tuple(candidate)
+                if key not in queued:
+                    queued.add(key)
+                    counter += 1
+                    heapq.heappush(candidates,
+                                   (len(candidate), counter, candidate))
+
+            if not candidates:
+                return
+            _, _, path = heapq.heappop(candidates)
+            found.append(path)
+            yield path
+
+    def restricted_path(self, source, target, blocked_people, blocked_steps):
+        """
+        Returns the shortest list of (movie, person) index pairs from the
+        source index to the target index that avoids the people in
+        `blocked_people` and whose first step is not in `blocked_steps`,
+        or None if there is none.
+        """
+        po, pm = self.person_offsets, self.person_movies
+        mo, mp = self.movie_offsets, self.movie_people
+        parents = {source: None}
+        expanded = set()
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for person in frontier:
+                for i in range(po[person], po[person + 1]):
+                    movie = pm[i]
+
+                    # Movies left by the source may still be taken later
+                    # to the stars its blocked steps skipped
+                    if person != source:
+                        if movie in expanded:
+                            continue
+                        expanded.add(movie)
+                    for j in range(mo[movie], mo[movie + 1]):
+                        neighbor = mp[j]
+                        if neighbor in parents or neighbor in blocked_people:
+                            continue
+                        if (person == source
+                                and (movie, neighbor) in blocked_steps):
+                            continue
+                        parents[neighbor] = (movie, person)
+                        if neighbor == target:
+                            path = []
+                            while parents[neighbor] is not None:
+                                movie, previous = parents[neighbor]
+                                path.append((movie, neighbor))
+                                neighbor = previous
+                            path.reverse()
+                            return path
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return None
+
+    def path_ids(self, path):
+        """
+        Converts a list of (movie, person) index pairs into
+        (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+
+# Bits of the visited marks used by each side of a bidirectional search
+FORWARD = 1
+BACKWARD = 2
+
+# Number of sources advanced together by a bit-parallel search
+WORD_SIZE = 64
+
+# Largest year accepted as the upper bound of a year range
+MAX_YEAR = 2 ** 31 - 1
+
+
+def year_number(year):
+    """
+    Returns a year column value as an int, or 0 if it is unknown.
+    """
+    year = year.strip()
+    return int(year) if year.isdigit() else 0
+
+
+def bits(mask):
+    """
+    Yields the positions of the bits set in `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def find_components(size, movie_offsets, movie_people):
+    """
+    Returns an array labelling each of `size` people with a
+    representative person of their connected component.
+
+    Uses union-find over the stars of each movie, with union by size and
+    path halving, and finally points every person straight at its root.
+    """
+    parent = array("i", range(size))
+    sizes = array("i", [1]) * size
+
+    def find(person):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if end - start < 2:
+            continue
+        root = find(movie_people[start])
+        for j in range(start + 1, end):
+            other = find(movie_people[j])
+            if other == root:
+                continue
+            if sizes[other] > sizes[root]:
+                root, other = other, root
+            parent[other] = root
+            sizes[root] += sizes[other]
+
+    for person in range(size):
+        parent[person] = find(person)
+    return parent
+
+
+def union(parent, a, b):
+    """
+    Joins the union-find trees holding `a` and `b` in `parent`,
+    halving the paths it walks.
+    """
+    roots = []
+    for person in (a, b):
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        roots.append(person)
+    if roots[0] != roots[1]:
+        parent[roots[1]] = roots[0]
+
+
+def writable(values):
+    """
+    Returns `values` if it is an array of ints,
+    or else a copy of it that can be changed.
+    """
+    if isinstance(values, array):
+        return values
+    copy = array("i")
+    copy.frombytes(memoryview(values).cast("B"))
+    return copy
+
+
+def merge_csr(offsets, targets, additions, size):
+    """
+    Returns (offsets, targets) arrays for the CSR `offsets` and `targets`
+    with the targets in `additions` appended to each of its sources,
+    grown to `size` sources.
+
+    Runs of sources without additions are copied in bulk.
+    """
+    old_size = len(offsets) - 1
+    counts = list(map(sub, offsets[1:], offsets[:-1]))
+    counts.extend([0] * (size - old_size))
+    for source, added in additions.items():
+        counts[source] += len(added)
+    merged_offsets = array("i", accumulate(counts, initial=0))
+
+    merged = array("i")
+    copied = 0
+    for source in sorted(additions):
+        stop = offsets[min(source + 1, old_size)]
+        merged.frombytes(memoryview(targets[copied:stop]).cast("B"))
+        copied = stop
+        merged.extend(additions[source])
+    merged.frombytes(memoryview(targets[copied:]).cast("B"))
+    return merged_offsets, merged
+
+
+def build_csr(size, sources, targets, count):
+    """
+    Returns (offsets, targets) arrays grouping `count` edges by source,
+    for sources numbered from 0 to `size` - 1.
+    """
+    sources = array("i", sources)
+    offsets = array("i", [0]) * (size + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    grouped = array("i", [0]) * count
+    position = offsets[:-1]
+    for source, target in zip(sources, targets):
+        grouped[position[source]] = target
+        position[source] += 1
+    return offsets, grouped
+
+
+def join_paths(meeting, source, target,
+               forward_person, forward_movie, backward_person, backward_movie):
+    """
+    Returns the (movie, person) index pairs of the path from the source to
+    the target through `meeting`, following the forward parents back to
+    the source and the backward parents on to the target.
+    """
+    path = []
+    person = meeting
+    while person != source:
+        path.append((forward_movie[person], person))
+        person = forward_person[person]
+    path.reverse()
+
+    person = meeting
+    while person != target:
+        path.append((backward_movie[person], backward_person[person]))
+        person = backward_person[person]
+    return path
+
+
+class SearchStats():
+    """
+    Counters describing one search:
+
+    explored: the number of people expanded
+    peak_frontier: the largest number of people waiting to be expanded
+    expansions: the number of (movie, star) entries scanned
+    seconds: the wall-clock time taken
+    allocated: the bytes of the arrays and dictionaries the search built
+    """
+
+    __slots__ = ("explored", "peak_frontier", "expansions", "seconds",
+                 "allocated", "started")
+
+    def __init__(self):
+        self.explored = 0
+        self.peak_frontier = 0
+        self.expansions = 0
+        self.seconds = 0.0
+        self.allocated = 0
+        self.started = time.perf_counter()
+
+    def frontier(self, size):
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def allocate(self, *buffers):
+        for buffer in buffers:
+            if isinstance(buffer, (dict, set)):
+                self.allocated += sys.getsizeof(buffer)
+            else:
+                self.allocated += memoryview(buffer).nbytes
+
+    def stop(self):
+        """
+        Records the time since the search started and returns the stats.
+        """
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        return {
+            "explored": self.explored,
+            "peak_frontier": self.peak_frontier,
+            "expansions": self.expansions,
+            "seconds": self.seconds,
+            "allocated": self.allocated
+        }
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping from person_ids to a dictionary of:
+    name, birth, movies (a set of movie_ids), backed by a StarGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping from movie_ids to a dictionary of:
+    title, year, stars (a set of person_ids), backed by a StarGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
@@ -0,0 +1,175 @@
+"""
+Landmark distances for A* search over the star graph (ALT).
+
+A few high-degree hub actors are chosen as landmarks and a breadth-first
+search from each one records its distance to every person. For any
+landmark L, the triangle inequality gives |d(L, t) - d(L, v)| <= d(v, t),
+so the largest such difference is an admissible, consistent heuristic.
+
+The distance arrays are saved next to the dataset, keyed like the
+snapshot on the CSV files' size and mtime.
+"""
+
+import json
+import mmap
+import os
+import sys
+
+from array import array
+
+from snapshot import align
+
+MAGIC = b"DEGLAND\0"
+VERSION = 1
+
+# Number of landmarks chosen by default
+COUNT = 16
+
+
+def landmarks_path(directory):
+    """
+    Returns the path of the landmarks file for a dataset directory.
+    """
+    return os.path.join(directory, "degrees.landmarks")
+
+
+def select_hubs(graph, count=COUNT):
+    """
+    Returns the indices of the `count` people with the most
+    co-star appearances, most connected first.
+    """
+    po, pm = graph.person_offsets, graph.person_movies
+    mo = graph.movie_offsets
+    degree = array("i", [0]) * len(graph.person_ids)
+    for person in range(len(graph.person_ids)):
+        total = 0
+        for i in range(po[person], po[person + 1]):
+            movie = pm[i]
+            total += mo[movie + 1] - mo[movie]
+        degree[person] = total
+    return sorted(range(len(degree)), key=lambda p: -degree[p])[:count]
+
+
+class Landmarks():
+    """
+    Hub people together with their distance to every person.
+    """
+
+    def __init__(self, hubs, distances):
+        self.hubs = hubs
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=COUNT):
+        """
+        Chooses `count` hubs and runs a breadth-first search from each.
+        """
+        hubs = select_hubs(graph, count)
+        return cls(hubs, [graph.distances_from(hub) for hub in hubs])
+
+    def bound_to(self, target):
+        """
+        Returns a function giving, for a person index, a lower bound on
+        its distance to the target, or None if some landmark proves the
+        two are not connected.
+        """
+        pairs = [(distances, distances[target])
+                 for distances in self.distances]
+
+        def bound(person):
+            best = 0
+            for distances, to_target in pairs:
+                to_person = distances[person]
+                if (to_person < 0) != (to_target < 0):
+                    return None
+                difference = abs(to_target - to_person)
+                if difference > best:
+                    best = difference
+            return best
+
+        return bound
+
+    def save(self, path, key):
+        """
+        Writes the landmarks to `path`, tagged with `key`.
+        """
+        header = json.dumps({
+            "version": VERSION,
+            "key": key,
+            "byteorder": sys.byteorder,
+            "hubs": list(self.hubs),
+            "size": len(self.distances[0]) if self.distances else 0
+        }).encode("utf-8")
+        start = align(len(MAGIC) + 4 + len(header))
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(MAGIC)
+                f.write(len(header).to_bytes(4, "little"))
+                f.write(header)
+                f.write(bytes(start - f.tell()))
+                for distances in self.distances:
+                    distances.tofile(f)
+                f.write(bytes(8))
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @classmethod
+    def load(cls, path, key):
+        """
+        Memory-maps the landmarks at `path`.
+        Returns None if there are none or they do not match `key`.
+        """
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+
+        with f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            size = int.from_bytes(f.read(4), "little")
+            try:
+                header = json.loads(f.read(size))
+            except ValueError:
+                return None
+            if (header.get("version") != VERSION
+                    or header.get("key") != key
+                    or header.get("byteorder") != sys.byteorder):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+        start = align(len(MAGIC) + 4 + size)
+        length = header["size"] * array("h").itemsize
+        distances = []
+        for i in range(len(header["hubs"])):
+            offset = start + i * length
+            distances.append(view[offset:offset + length].cast("h"))
+        return cls(header["hubs"], distances)
+
+
+def load_landmarks(directory, graph, key, count=COUNT):
+    """
+    Returns the landmarks saved for the dataset in `directory`,
+    building and saving them first if they are missing or stale.
+
+    With no `key` the graph does not match the files on disk, so the
+    landmarks are built without being saved.
+    """
+    count = min(count, len(graph.person_ids))
+    if key is None:
+        return Landmarks.build(graph, count)
+
+    path = landmarks_path(directory)
+    landmarks = Landmarks.load(path, key)
+    if landmarks is None or len(landmarks.hubs) != count:
+        landmarks = Landmarks.build(graph, count)
+        try:
+            landmarks.save(path, key)
+        except OSError:
+            pass
+    return landmarks
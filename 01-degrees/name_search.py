@@ -0,0 +1,284 @@
+"""
+Prefix and approximate name lookup for people in a StarGraph.
+
+Prefix lookups binary-search the people sorted by lowercase name, which
+answers the same queries as a character trie without allocating a node
+per character. Approximate lookups use an index from every trigram of a
+name to the people holding it, and count the trigrams every person
+shares with the query at once, with bitwise operations on bitsets of
+people. People appended to the graph are added to both without
+rebuilding them.
+"""
+
+import heapq
+
+from array import array
+from bisect import bisect_left, insort
+
+from graph import bits, writable
+
+# Number of people scanned in a prefix range before ranking
+SCAN_LIMIT = 5000
+
+# Trigrams held by at least one person in DENSE keep their people as a
+# bitset rather than an array of indices
+DENSE = 128
+
+# Maps every byte to 1 if it has a bit set, 0 if not
+NONZERO = bytes([0] + [1] * 255)
+
+
+def trigrams(name):
+    """
+    Returns the set of trigrams of a lowercase name,
+    padded so that its start and end count too.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bitset(people):
+    """
+    Returns the integer with the bits of the person indices in `people`,
+    in increasing order, set.
+    """
+    if not people:
+        return 0
+    buffer = bytearray(people[-1] // 8 + 1)
+    for person in people:
+        buffer[person >> 3] |= 1 << (person & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def members(mask):
+    """
+    Returns the person indices whose bits are set in `mask`, lowest first.
+    """
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    found = data.translate(NONZERO)
+    people = []
+    i = found.find(1)
+    while i >= 0:
+        people.extend(8 * i + bit for bit in bits(data[i]))
+        i = found.find(1, i + 1)
+    return people
+
+
+class NameSearch():
+    """
+    Index over the names of the people in a StarGraph.
+
+    `order` lists person indices sorted by lowercase name; it is copied,
+    or computed if not given. The trigram index is built by `build_index`,
+    or else on the first approximate lookup.
+    """
+
+    def __init__(self, graph, order=None):
+        self.graph = graph
+        if order is None:
+            names = graph.person_names
+            order = array("i", sorted(
+                range(len(names)), key=lambda i: names[i].lower()
+            ))
+        else:
+            order = array("i", writable(order))
+        self.order = order
+        self.index = None
+        self.bitsets = None
+        self.sizes = None
+
+    def lower_name(self, person):
+        return self.graph.person_names[person].lower()
+
+    def candidate(self, person, score):
+        """
+        Returns the description of a person returned by lookups.
+        """
+        graph = self.graph
+        offsets = graph.person_offsets
+        return {
+            "id": graph.person_ids[person],
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": offsets[person + 1] - offsets[person],
+            "score": score
+        }
+
+    def rank(self, scored, limit):
+        """
+        Returns the `limit` best candidates from (person, score) pairs,
+        by score and then by number of movies.
+        """
+        names = self.graph.person_names
+        offsets = self.graph.person_offsets
+        best = heapq.nsmallest(limit, scored, key=lambda pair: (
+            -pair[1],
+            offsets[pair[0]] - offsets[pair[0] + 1],
+            names[pair[0]]
+        ))
+        return [self.candidate(person, score) for person, score in best]
+
+    def prefix(self, text, limit=10):
+        """
+        Returns the best known people whose name starts with `text`,
+        ignoring case. A name equal to `text` scores 1, a longer one 0.5.
+        """
+        text = text.lower()
+        order = self.order
+        i = bisect_left(order, text, key=self.lower_name)
+        scored = []
+        while i < len(order) and len(scored) < SCAN_LIMIT:
+            person = order[i]
+            name = self.lower_name(person)
+            if name == text:
+                scored.append((person, 1.0))
+            elif not name.startswith(text):
+                break
+            else:
+                scored.append((person, 0.5))
+            i += 1
+        return self.rank(scored, limit)
+
+    def build_index(self):
+        """
+        Builds the index from every trigram to the people whose
+        lowercase name contains it, and the bitsets of the people whose
+        names have each number of trigrams.
+        """
+        names = self.graph.person_names
+        postings = {}
+        sizes = {}
+        for person, name in enumerate(names):
+            grams = trigrams(name.lower())
+            sizes.setdefault(len(grams), array("i")).append(person)
+            for trigram in grams:
+                if trigram not in postings:
+                    postings[trigram] = array("i")
+                postings[trigram].append(person)
+
+        self.index = {}
+        self.bitsets = {}
+        for trigram, people in postings.items():
+            if len(people) * DENSE >= len(names):
+                self.bitsets[trigram] = bitset(people)
+            else:
+                self.index[trigram] = people
+        self.sizes = {size: bitset(people) for size, people in sizes.items()}
+
+    def add(self, person):
+        """
+        Adds a person index appended to the graph.
+        """
+        insort(self.order, person, key=self.lower_name)
+        if self.index is None:
+            return
+        grams = trigrams(self.lower_name(person))
+        bit = 1 << person
+        self.sizes[len(grams)] = self.sizes.get(len(grams), 0) | bit
+        for trigram in grams:
+            if trigram in self.bitsets:
+                self.bitsets[trigram] |= bit
+            else:
+                if trigram not in self.index:
+                    self.index[trigram] = array("i")
+                self.index[trigram].append(person)
+
+    def fuzzy(self, text, limit=10):
+        """
+        Returns the people whose names share the most trigrams with
+        `text`, scored by the Dice coefficient of the two trigram sets.
+
+        The people holding each query trigram are added, as a bitset,
+        into a bit-sliced counter, where bit i of the number of trigrams
+        a person shares is their bit in `counts[i]`. Everyone sharing
+        `shared` of the query's `count` trigrams with `size` trigrams of
+        their own scores 2 * shared / (count + size), so people are taken
+        a whole (shared, size) group at a time by masking, best score
+        first, until the next group scores less than the `limit`th
+        person taken.
+        """
+        if self.index is None:
+            self.build_index()
+
+        query = trigrams(text.lower())
+        count = len(query)
+        counts = []
+        for trigram in query:
+            people = self.bitsets.get(trigram)
+            if people is None:
+                people = bitset(self.index.get(trigram, ()))
+
+            # Add one to the count of every person in `people`
+            for i, bit in enumerate(counts):
+                if not people:
+                    break
+                counts[i] = bit ^ people
+                people &= bit
+            if people:
+                counts.append(people)
+        if not counts or limit < 1:
+            return []
+
+        full = (1 << max(bit.bit_length() for bit in counts)) - 1
+        most = min(count, (1 << len(counts)) - 1)
+        groups = sorted(
+            ((2 * shared / (count + size), shared, size)
+             for size in self.sizes
+             for shared in range(1, min(most, size) + 1)),
+            reverse=True
+        )
+
+        # Stop early if fewer than `limit` people share any trigram
+        total = 0
+        for bit in counts:
+            total |= bit
+        total = total.bit_count()
+
+        scored = []
+        lowest = None
+        sharing = {}
+        for score, shared, size in groups:
+            score = round(score, 3)
+            if lowest is not None and score < lowest or len(scored) == total:
+                break
+
+            # People sharing exactly `shared` trigrams
+            mask = sharing.get(shared)
+            if mask is None:
+                mask = full
+                for i, bit in enumerate(counts):
+                    mask &= bit if shared >> i & 1 else full ^ bit
+                    if not mask:
+                        break
+                sharing[shared] = mask
+
+            mask &= self.sizes[size]
+            if mask:
+                scored.extend((person, score) for person in members(mask))
+                if lowest is None and len(scored) >= limit:
+                    lowest = score
+        return self.rank(scored, limit)
+
+    def lookup(self, text, limit=10):
+        """
+        Returns up to `limit` ranked candidates for `text`: exact matches
+        first, then prefix matches, then approximate matches. Scores only
+        order candidates within each of these, as a prefix match scores
+        0.5 however close an approximate match is.
+
+        >>> from graph import StarGraph
+        >>> names = ["Tom Hanks", "Tim Hanks", "Colin Hanks"]
+        >>> graph = StarGraph(["1", "2", "3"], names, [""] * 3, [], [], [],
+        ...                   [0] * 4, [], [0], [])
+        >>> [c["name"] for c in NameSearch(graph).lookup("Tom Hank")]
+        ['Tom Hanks', 'Tim Hanks', 'Colin Hanks']
+        """
+        # prefix() already ranks exact matches before longer names
+        results = []
+        seen = set()
+        for found in (self.prefix(text, limit), self.fuzzy(text, limit)):
+            for candidate in found:
+                if candidate["id"] not in seen:
+                    seen.add(candidate["id"])
+                    results.append(candidate)
+        return results[:limit]
@@ -0,0 +1,211 @@
+"""
+Query server for degrees with the graph kept in memory.
+
+Loads the dataset once and answers requests from local clients over a
+localhost TCP port or a Unix socket. Each request is one line of JSON
+and gets one line of JSON back:
+
+    {"op": "person", "name": "Kevin Bacon"}
+    {"op": "person", "name": "kevn baco"}
+    {"op": "path", "source": "102", "target": "Tom Hanks"}
+    {"op": "stats"}
+
+Name lookups are answered on the event loop. Searches are CPU-bound and
+run on a pool of forked worker processes that inherit the graph, so the
+event loop keeps serving other connections while they run.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+
+import degrees
+
+from batch import init_worker, pool_context, solve
+
+
+class Server():
+    """
+    Answers JSON line requests and keeps latency counters per operation.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.latency = {}
+        self.searches = {}
+
+    async def handle(self, reader, writer):
+        """
+        Serves one client connection until it closes.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        """
+        Returns the response to one request line,
+        recording how long it took.
+        """
+        start = time.perf_counter()
+        op = None
+        try:
+            request = json.loads(line)
+            op = request["op"]
+            if op == "person":
+                response = self.person(text(request, "name"))
+            elif op == "path":
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, solve,
+                    (text(request, "source"), text(request, "target"))
+                )
+                self.record_search(response.get("stats"))
+            elif op == "stats":
+                response = self.stats()
+            else:
+                response = {"error": f"unknown op {op!r}"}
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"error": f"bad request: {e}"}
+        self.record(op if op in ("person", "path", "stats") else "error",
+                    time.perf_counter() - start)
+        return response
+
+    def person(self, name):
+        """
+        Returns the people matching a name, with their birth years,
+        and ranked prefix and approximate matches when there is no
+        exact one.
+        """
+        graph = degrees.graph
+        person_ids = degrees.names.get(name.lower(), set())
+        if not person_ids and name in graph.person_index:
+            person_ids = {name}
+        people = []
+        for person_id in sorted(person_ids):
+            person = graph.person_index[person_id]
+            people.append({
+                "id": person_id,
+                "name": graph.person_names[person],
+                "birth": graph.person_births[person]
+            })
+        response = {"name": name, "people": people}
+        if not people:
+            response["candidates"] = degrees.find_people(name)
+        return response
+
+    def record(self, op, seconds):
+        """
+        Adds one request to the latency counters of `op`.
+        """
+        counters = self.latency.setdefault(
+            op, {"count": 0, "total": 0.0, "max": 0.0}
+        )
+        counters["count"] += 1
+        counters["total"] += seconds
+        counters["max"] = max(counters["max"], seconds)
+
+    def record_search(self, stats):
+        """
+        Adds the SearchStats dictionary of one path search, if it ran,
+        to the search counters.
+        """
+        if stats is None:
+            return
+        searches = self.searches
+        searches["count"] = searches.get("count", 0) + 1
+        for name in ("explored", "expansions", "seconds", "allocated"):
+            searches[name] = searches.get(name, 0) + stats[name]
+        searches["peak_frontier"] = max(searches.get("peak_frontier", 0),
+                                        stats["peak_frontier"])
+
+    def stats(self):
+        """
+        Returns the request count and mean and max latency
+        in milliseconds of every operation, and the totals of the
+        path searches run.
+        """
+        stats = {}
+        for op, counters in self.latency.items():
+            stats[op] = {
+                "count": counters["count"],
+                "mean_ms": 1000 * counters["total"] / counters["count"],
+                "max_ms": 1000 * counters["max"]
+            }
+        return {"latency": stats, "searches": self.searches}
+
+
+def text(request, field):
+    """
+    Returns the string value of `field` in a request,
+    raising TypeError if it has another type.
+    """
+    value = request[field]
+    if not isinstance(value, str):
+        raise TypeError(f"{field} must be a string")
+    return value
+
+
+async def serve(server, host, port, unix):
+    """
+    Accepts connections on a Unix socket if `unix` is given,
+    or else on `host` and `port`, until cancelled.
+    """
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle, path=unix)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    for sock in listener.sockets:
+        print("Listening on", sock.getsockname())
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve degrees of separation queries."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+
+    # Build the trigram index now rather than on the first lookup
+    degrees.name_index().build_index()
+    print("Data loaded.")
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=pool_context(),
+        initializer=init_worker, initargs=(args.directory,)
+    )
+    try:
+        asyncio.run(serve(Server(executor), args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Binary snapshot of a loaded StarGraph.
+
+The snapshot holds the CSR incidence arrays with the year of each
+person's movies, the connected component of every person, every string
+column of the people and movies tables and the sorted orders used to look
+people up by id and by name. It is written once after the CSV files are
+parsed and memory-mapped on later runs, so nothing is decoded until it
+is used.
+
+When rows have only been appended to the CSV files since the snapshot was
+written, the snapshot can still be used: `appended_rows` reads just the
+new rows so they can be applied to the loaded graph.
+
+Layout: an 8-byte magic, a 4-byte little-endian header length, a JSON
+header and then the sections, each aligned to 8 bytes. Every section is
+an array of C ints; a string column is stored as an offsets section and
+a UTF-8 data section.
+"""
+
+import csv
+import io
+import json
+import mmap
+import os
+import sys
+import zlib
+
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Mapping, Sequence
+
+from graph import StarGraph, writable
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 4
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Number of bytes at the end of each CSV file checksummed in the key, used
+# to tell whether rows were appended to the file or it was rewritten
+TAIL = 4096
+
+ARRAYS = ("person_offsets", "person_movies", "person_movie_years",
+          "movie_offsets", "movie_people", "components")
+
+STRINGS = ("person_ids", "person_names", "person_births",
+           "movie_ids", "movie_titles", "movie_years")
+
+
+def snapshot_path(directory):
+    """
+    Returns the path of the snapshot for a dataset directory.
+    """
+    return os.path.join(directory, "degrees.snapshot")
+
+
+def snapshot_key(directory):
+    """
+    Returns the size, modification time and a checksum of the last TAIL
+    bytes of each CSV file in `directory`. A snapshot is only valid for
+    the key it was written with.
+    """
+    key = {}
+    for filename in SOURCES:
+        path = os.path.join(directory, filename)
+        size = os.stat(path).st_size
+        key[filename] = [size, os.stat(path).st_mtime_ns,
+                         tail_checksum(path, size)]
+    return key
+
+
+def tail_checksum(path, size):
+    """
+    Returns the CRC-32 of the TAIL bytes of a file ending at `size`.
+    """
+    with open(path, "rb") as f:
+        f.seek(max(size - TAIL, 0))
+        return zlib.crc32(f.read(min(size, TAIL)))
+
+
+def appended_rows(directory, key):
+    """
+    Returns a dictionary mapping each CSV file in `directory` to the list
+    of rows appended to it since it had the size recorded in `key`.
+
+    Returns None if any file shrank, changed before that point, or did
+    not end with a complete line, since the snapshot must then be rebuilt.
+    """
+    rows = {}
+    for filename in SOURCES:
+        path = os.path.join(directory, filename)
+        size, _, checksum = key[filename]
+        if os.stat(path).st_size < size:
+            return None
+        if tail_checksum(path, size) != checksum:
+            return None
+        with open(path, "rb") as f:
+            header = f.readline().decode("utf-8")
+            f.seek(max(size - 1, 0))
+            if size > 0 and f.read(1) != b"\n":
+                return None
+            appended = f.read().decode("utf-8")
+        fieldnames = next(csv.reader([header]))
+        rows[filename] = list(
+            csv.DictReader(io.StringIO(appended), fieldnames=fieldnames)
+        )
+    return rows
+
+
+def write_snapshot(path, graph, key, names=None):
+    """
+    Writes `graph` to a snapshot file at `path`, tagged with `key`.
+    The file is written next to `path` first and then moved into place.
+
+    If `names` is a NameIndex, its order is saved instead of sorting
+    the names again.
+    """
+    sections = {}
+    for name in ARRAYS:
+        sections[name] = getattr(graph, name)
+    sections["components"] = array(
+        "i", map(graph.component, range(len(graph.person_ids)))
+    )
+    for name in STRINGS:
+        offsets, data = encode_strings(getattr(graph, name))
+        sections[f"{name}.offsets"] = offsets
+        sections[f"{name}.data"] = data
+
+    # Reuse the sorted orders of a graph loaded from a snapshot
+    person_names = graph.person_names
+    sections["person_order"] = getattr(
+        graph.person_index, "order", None
+    ) or sorted_order(graph.person_ids)
+    sections["movie_order"] = getattr(
+        graph.movie_index, "order", None
+    ) or sorted_order(graph.movie_ids)
+    sections["name_order"] = getattr(names, "order", None) or array(
+        "i", sorted(range(len(person_names)),
+                    key=lambda i: person_names[i].lower())
+    )
+
+    # Lay the sections out one after another, aligned to 8 bytes
+    layout = {}
+    position = 0
+    for name, values in sections.items():
+        length = memoryview(values).nbytes
+        layout[name] = [position, length]
+        position += align(length)
+
+    header = json.dumps({
+        "version": VERSION,
+        "key": key,
+        "byteorder": sys.byteorder,
+        "itemsize": array("i").itemsize,
+        "sections": layout
+    }).encode("utf-8")
+    start = align(len(MAGIC) + 4 + len(header))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(bytes(start - f.tell()))
+            for name, values in sections.items():
+                f.write(values)
+                f.write(bytes(align(layout[name][1]) - layout[name][1]))
+            f.write(bytes(8))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def open_snapshot(path):
+    """
+    Memory-maps the snapshot at `path` whatever its key and returns a
+    triple (graph, names, key).
+
+    Returns None if there is no snapshot or it cannot be read here.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        size = int.from_bytes(f.read(4), "little")
+        try:
+            header = json.loads(f.read(size))
+        except ValueError:
+            return None
+        if (header.get("version") != VERSION
+                or header.get("byteorder") != sys.byteorder
+                or header.get("itemsize") != array("i").itemsize):
+            return None
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(buffer)
+    start = align(len(MAGIC) + 4 + size)
+    sections = header["sections"]
+
+    def section(name):
+        offset, length = sections[name]
+        return view[start + offset:start + offset + length].cast("i")
+
+    def strings(name):
+        offset, length = sections[f"{name}.data"]
+        data = view[start + offset:start + offset + length]
+        return StringTable(section(f"{name}.offsets"), data)
+
+    columns = {name: strings(name) for name in STRINGS}
+    arrays = {name: section(name) for name in ARRAYS}
+    graph = StarGraph(
+        person_index=SortedIndex(columns["person_ids"],
+                                 section("person_order")),
+        movie_index=SortedIndex(columns["movie_ids"],
+                                section("movie_order")),
+        **columns, **arrays
+    )
+    names = NameIndex(graph, section("name_order"))
+    return graph, names, header["key"]
+
+
+def align(length):
+    """
+    Rounds `length` up to a multiple of 8.
+    """
+    return (length + 7) & ~7
+
+
+def encode_strings(strings):
+    """
+    Returns (offsets, data) arrays storing `strings` back to back
+    as UTF-8, with `offsets` holding one more entry than `strings`.
+    """
+    offsets = array("i", [0])
+    data = bytearray()
+    for string in strings:
+        data += string.encode("utf-8")
+        offsets.append(len(data))
+    return offsets, array("B", data)
+
+
+def sorted_order(keys):
+    """
+    Returns the indices of `keys` sorted by key.
+    """
+    return array("i", sorted(range(len(keys)), key=keys.__getitem__))
+
+
+class StringTable(Sequence):
+    """
+    Sequence of strings decoded on access from a memory-mapped
+    offsets array and UTF-8 data buffer, followed by a list of
+    strings appended since it was loaded.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.extra = []
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        size = len(self.offsets) - 1
+        if i >= size:
+            return self.extra[i - size]
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.extra)
+
+    def append(self, string):
+        self.extra.append(string)
+
+
+class SortedIndex(Mapping):
+    """
+    Mapping from keys to their positions in a table of strings,
+    answered by binary search over the table's sorted order.
+
+    A key appended to the table is added with `index[key] = position`.
+    """
+
+    def __init__(self, keys, order):
+        self.keys = keys
+        self.order = order
+
+    def __getitem__(self, key):
+        keys, order = self.keys, self.order
+        i = bisect_left(order, key, key=keys.__getitem__)
+        if i < len(order) and keys[order[i]] == key:
+            return order[i]
+        raise KeyError(key)
+
+    def __setitem__(self, key, position):
+        if self.keys[position] != key:
+            raise ValueError(f"{key!r} is not at position {position}")
+        self.order = writable(self.order)
+        insort(self.order, position, key=self.keys.__getitem__)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class NameIndex(Mapping):
+    """
+    Mapping from lowercase names to sets of person_ids,
+    answered by binary search over the people sorted by lowercase name.
+    """
+
+    def __init__(self, graph, order):
+        self.graph = graph
+        self.order = order
+
+    def lower_name(self, person):
+        return self.graph.person_names[person].lower()
+
+    def add(self, person):
+        """
+        Adds a person index appended to the graph.
+        """
+        self.order = writable(self.order)
+        insort(self.order, person, key=self.lower_name)
+
+    def __getitem__(self, name):
+        order = self.order
+        i = bisect_left(order, name, key=self.lower_name)
+        person_ids = set()
+        while i < len(order) and self.lower_name(order[i]) == name:
+            person_ids.add(self.graph.person_ids[order[i]])
+            i += 1
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __iter__(self):
+        previous = None
+        for person in self.order:
+            name = self.lower_name(person)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,238 @@
+"""
+Headless self-play benchmark for the Tic Tac Toe engines.
+
+Plays a number of games between two engines, X first, without pygame,
+and reports for each engine its moves per second of thinking time, the
+positions it searched per move and its median and 99th percentile move
+latency, followed by the share of games won by each side and tied.
+
+    python benchmark.py optimal random -n 1000
+    python benchmark.py search mcts --size 5 5 4 --seconds 0.2 -j 4
+
+Games are independent, so with -j they are spread over a process pool.
+With --seed every engine that draws random numbers is seeded from it and
+the game number, so results can be reproduced.
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import time
+
+import bitboard
+import mcts
+import search
+import table
+
+from parallel import pool_context
+
+
+class RandomEngine():
+    """
+    Plays a random empty cell.
+    """
+
+    def __init__(self, game, options, seed):
+        self.rng = random.Random(seed)
+        self.nodes = 0
+
+    def move(self, position):
+        return self.rng.choice(position.actions())
+
+
+class OptimalEngine():
+    """
+    Plays what tictactoe.minimax would: a perfect-play table lookup on the
+    standard board, counted as one node, and an iterative-deepening search
+    on any other.
+    """
+
+    def __init__(self, game, options, seed):
+        self.search = None
+        if game != bitboard.STANDARD:
+            self.search = search.Search(game, options.seconds)
+        self.nodes = 0
+
+    def move(self, position):
+        if self.search is None:
+            self.nodes += 1
+            try:
+                return table.best_move(position.x, position.o)
+            except KeyError:
+                return bitboard.best_move(position.x, position.o)
+        cell = self.search.best_move(position)
+        self.nodes = self.search.nodes
+        return cell
+
+
+class SearchEngine():
+    """
+    Plays the move of an iterative-deepening search on any board.
+    """
+
+    def __init__(self, game, options, seed):
+        self.search = search.Search(game, options.seconds)
+        self.nodes = 0
+
+    def move(self, position):
+        cell = self.search.best_move(position)
+        self.nodes = self.search.nodes
+        return cell
+
+
+class MonteCarloEngine():
+    """
+    Plays the move of a Monte Carlo tree search, in this process.
+    """
+
+    def __init__(self, game, options, seed):
+        self.search = mcts.MCTS(game, options.playouts,
+                                None if options.playouts else options.seconds,
+                                seed)
+        self.nodes = 0
+
+    def move(self, position):
+        cell = self.search.best_move(position)
+        self.nodes = self.search.nodes
+        return cell
+
+
+# Engines by name; each is built with (game, options, seed) and has a
+# move(position) method and a running count of the nodes it searched
+ENGINES = {
+    "optimal": OptimalEngine,
+    "random": RandomEngine,
+    "search": SearchEngine,
+    "mcts": MonteCarloEngine
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Tic Tac Toe engines against each other."
+    )
+    parser.add_argument("x", choices=ENGINES, help="engine playing X")
+    parser.add_argument("o", choices=ENGINES, help="engine playing O")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="number of worker processes, 0 for one per core")
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("ROWS", "COLUMNS", "K"))
+    parser.add_argument("--seconds", type=float, default=search.TIME_BUDGET,
+                        help="time budget per move of the searches")
+    parser.add_argument("--playouts", type=int, default=None,
+                        help="playouts per move of mcts, instead of time")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true",
+                        help="print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        bitboard.Game(*args.size)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+def run(options):
+    """
+    Plays `options.games` games and returns the report.
+    """
+    tasks = [(options, number) for number in range(options.games)]
+    if options.workers == 1:
+        games = list(map(play, tasks))
+    else:
+        with pool_context().Pool(options.workers or None) as pool:
+            games = pool.map(play, tasks, chunksize=1)
+    return summarize(options, games)
+
+
+def play(task):
+    """
+    Plays game number `number` of an (options, number) task.
+
+    Returns a dictionary of: winner (X, O or None), and moves, mapping X
+    and O to lists of (seconds, nodes) pairs, one per move.
+    """
+    options, number = task
+    game = bitboard.Game(*options.size)
+    engines = {}
+    for mark, name in ((bitboard.X, options.x), (bitboard.O, options.o)):
+        seed = None
+        if options.seed is not None:
+            seed = f"{options.seed}:{number}:{mark}"
+        engines[mark] = ENGINES[name](game, options, seed)
+
+    moves = {bitboard.X: [], bitboard.O: []}
+    position = game.position()
+    while not position.terminal():
+        mark = position.player()
+        engine = engines[mark]
+        nodes = engine.nodes
+        start = time.perf_counter()
+        cell = engine.move(position)
+        seconds = time.perf_counter() - start
+        moves[mark].append((seconds, engine.nodes - nodes))
+        position = position.result(cell)
+    return {"winner": position.winner(), "moves": moves}
+
+
+def summarize(options, games):
+    """
+    Returns the report of a list of played games.
+    """
+    report = {"games": len(games), "size": options.size, "engines": {}}
+    for mark, name in ((bitboard.X, options.x), (bitboard.O, options.o)):
+        moves = [move for played in games for move in played["moves"][mark]]
+        latencies = sorted(seconds for seconds, _ in moves)
+        thinking = sum(latencies)
+        report["engines"][mark] = {
+            "engine": name,
+            "moves": len(moves),
+            "moves_per_second": len(moves) / thinking if thinking else None,
+            "nodes_per_move": (sum(nodes for _, nodes in moves) / len(moves)
+                               if moves else None),
+            "p50_ms": 1000 * percentile(latencies, 50),
+            "p99_ms": 1000 * percentile(latencies, 99)
+        }
+
+    winners = [played["winner"] for played in games]
+    count = max(len(games), 1)
+    report["x_wins"] = winners.count(bitboard.X) / count
+    report["o_wins"] = winners.count(bitboard.O) / count
+    report["draws"] = winners.count(None) / count
+    return report
+
+
+def percentile(values, rank):
+    """
+    Returns the nearest-rank percentile of sorted `values`, 0 if empty.
+    """
+    if not values:
+        return 0
+    return values[max(math.ceil(rank / 100 * len(values)) - 1, 0)]
+
+
+def print_report(report):
+    rows, columns, k = report["size"]
+    print(f"{report['games']} games on {rows}x{columns}, {k} in a row")
+    for mark, stats in report["engines"].items():
+        rate = stats["moves_per_second"]
+        nodes = stats["nodes_per_move"]
+        print(f"{mark} {stats['engine']}: {stats['moves']} moves, "
+              f"{'-' if rate is None else f'{rate:.0f}'} moves/s, "
+              f"{'-' if nodes is None else f'{nodes:.1f}'} nodes/move, "
+              f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms")
+    print(f"X wins {report['x_wins']:.1%}, O wins {report['o_wins']:.1%}, "
+          f"draws {report['draws']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
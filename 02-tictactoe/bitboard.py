@@ -0,0 +1,403 @@
+"""
+Bitboard Tic Tac Toe engine
+
+Each side's marks are stored as an integer with one bit per cell, 9 bits
+for the standard board, where bit 3 * i + j stands for cell (i, j). A
+position is the pair (x, o) of those integers.
+
+`Game` holds the rules for any board size and line length; the
+module-level functions play the standard 3x3 game.
+"""
+
+import math
+import random
+
+X = "X"
+O = "O"
+
+
+class Game():
+    """
+    Rules of an m,n,k game: two players take turns marking the cells of a
+    board with `rows` rows and `columns` columns, and the first to mark
+    `k` cells in a row, column or diagonal wins.
+
+    Cell (i, j) is bit `columns * i + j` of a side's bitboard.
+    """
+
+    def __init__(self, rows=3, columns=3, k=3):
+        if not 1 <= k <= max(rows, columns) or min(rows, columns) < 1:
+            raise ValueError(f"no {k} in a row on a {rows}x{columns} board")
+        self.rows = rows
+        self.columns = columns
+        self.k = k
+        self.size = rows * columns
+        self.full = (1 << self.size) - 1
+
+        # Masks of the k cells of every row, column and diagonal window
+        self.lines = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for i in range(rows):
+                for j in range(columns):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if not (0 <= end_i < rows and 0 <= end_j < columns):
+                        continue
+                    self.lines.append(sum(
+                        1 << (columns * (i + di * step) + j + dj * step)
+                        for step in range(k)
+                    ))
+        if k == 1:
+            self.lines = sorted(set(self.lines))
+
+        # Lines through every cell, the only ones a move there can complete
+        self.lines_through = [
+            [line for line in self.lines if line >> cell & 1]
+            for cell in range(self.size)
+        ]
+
+        # Random 64-bit code of every cell for each side, the same in
+        # every process for the same rules
+        generator = random.Random(f"{rows},{columns},{k}")
+        self.zobrist = [
+            [generator.getrandbits(64) for _ in range(self.size)]
+            for _ in (X, O)
+        ]
+
+    def __repr__(self):
+        return f"Game({self.rows}, {self.columns}, {self.k})"
+
+    def __eq__(self, other):
+        return (isinstance(other, Game)
+                and (self.rows, self.columns, self.k)
+                == (other.rows, other.columns, other.k))
+
+    def __hash__(self):
+        return hash((self.rows, self.columns, self.k))
+
+    def hash(self, x, o):
+        """
+        Returns the Zobrist hash of a position: the xor of the codes of
+        every marked cell.
+        """
+        value = 0
+        for side, marks in enumerate((x, o)):
+            codes = self.zobrist[side]
+            while marks:
+                low = marks & -marks
+                value ^= codes[low.bit_length() - 1]
+                marks ^= low
+        return value
+
+    def position(self, x=0, o=0):
+        """
+        Returns the Position with bitboards `x` and `o`,
+        the empty board by default.
+        """
+        return Position(self, x, o)
+
+    def from_board(self, board):
+        """
+        Returns the (x, o) bitboards of a list of lists board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell == X:
+                    x |= 1 << (self.columns * i + j)
+                elif cell == O:
+                    o |= 1 << (self.columns * i + j)
+        return x, o
+
+    def to_board(self, x, o):
+        """
+        Returns the list of lists board of (x, o) bitboards.
+        """
+        board = []
+        for i in range(self.rows):
+            row = []
+            for j in range(self.columns):
+                cell = self.columns * i + j
+                if x >> cell & 1:
+                    row.append(X)
+                elif o >> cell & 1:
+                    row.append(O)
+                else:
+                    row.append(None)
+            board.append(row)
+        return board
+
+    def cell(self, action):
+        """
+        Returns the cell number of an (i, j) action.
+        """
+        return self.columns * action[0] + action[1]
+
+    def action(self, cell):
+        """
+        Returns the (i, j) action of a cell number.
+        """
+        return divmod(cell, self.columns)
+
+    def key(self, x, o):
+        """
+        Returns an integer identifying the position.
+        """
+        return x | o << self.size
+
+    def player(self, x, o):
+        """
+        Returns the player who has the next turn.
+        """
+        return O if x.bit_count() > o.bit_count() else X
+
+    def actions(self, x, o):
+        """
+        Returns the empty cells of the position, in increasing order.
+        """
+        free = self.full & ~(x | o)
+        cells = []
+        while free:
+            low = free & -free
+            cells.append(low.bit_length() - 1)
+            free ^= low
+        return cells
+
+    def result(self, x, o, cell):
+        """
+        Returns the position after the player to move marks `cell`.
+        """
+        bit = 1 << cell
+        if (x | o) & bit or not 0 <= cell < self.size:
+            raise ValueError(f"cell {cell} is not empty")
+        if x.bit_count() > o.bit_count():
+            return x, o | bit
+        return x | bit, o
+
+    def lined(self, marks):
+        """
+        Returns True if `marks` covers a whole line.
+        """
+        for line in self.lines:
+            if marks & line == line:
+                return True
+        return False
+
+    def lined_at(self, marks, cell):
+        """
+        Returns True if `marks` covers a whole line through `cell`.
+        """
+        for line in self.lines_through[cell]:
+            if marks & line == line:
+                return True
+        return False
+
+    def winner(self, x, o):
+        """
+        Returns the winner of the position, if there is one.
+        """
+        if self.lined(x):
+            return X
+        if self.lined(o):
+            return O
+        return None
+
+    def terminal(self, x, o):
+        """
+        Returns True if the game is over.
+        """
+        return (x | o) == self.full or self.lined(x) or self.lined(o)
+
+    def utility(self, x, o):
+        """
+        Returns 1 if X has won, -1 if O has won, 0 otherwise.
+        """
+        if self.lined(x):
+            return 1
+        if self.lined(o):
+            return -1
+        return 0
+
+
+class Position():
+    """
+    Immutable position of a Game: the bitboards of both sides and their
+    Zobrist hash, which `result` updates with one xor instead of hashing
+    the board again. `last` is the cell marked last, if known.
+
+    Since a position never changes, it can be used as a dictionary key and
+    shared between threads or sent to other processes.
+    """
+
+    __slots__ = ("game", "x", "o", "hash", "last")
+
+    def __init__(self, game, x=0, o=0, hash=None, last=None):
+        if hash is None:
+            hash = game.hash(x, o)
+        set_slot = object.__setattr__
+        set_slot(self, "game", game)
+        set_slot(self, "x", x)
+        set_slot(self, "o", o)
+        set_slot(self, "hash", hash)
+        set_slot(self, "last", last)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("positions cannot be changed")
+
+    def __delattr__(self, name):
+        raise AttributeError("positions cannot be changed")
+
+    def __reduce__(self):
+        return Position, (self.game, self.x, self.o, self.hash, self.last)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return (isinstance(other, Position) and self.x == other.x
+                and self.o == other.o and self.game == other.game)
+
+    def __repr__(self):
+        return f"Position({self.game!r}, {self.x:#x}, {self.o:#x})"
+
+    def player(self):
+        return self.game.player(self.x, self.o)
+
+    def actions(self):
+        return self.game.actions(self.x, self.o)
+
+    def result(self, cell):
+        """
+        Returns the position after the player to move marks `cell`.
+        """
+        game, x, o = self.game, self.x, self.o
+        bit = 1 << cell
+        if (x | o) & bit or not 0 <= cell < game.size:
+            raise ValueError(f"cell {cell} is not empty")
+        if x.bit_count() > o.bit_count():
+            return Position(game, x, o | bit,
+                            self.hash ^ game.zobrist[1][cell], cell)
+        return Position(game, x | bit, o,
+                        self.hash ^ game.zobrist[0][cell], cell)
+
+    def winner(self):
+        return self.game.winner(self.x, self.o)
+
+    def terminal(self):
+        return self.game.terminal(self.x, self.o)
+
+    def utility(self):
+        return self.game.utility(self.x, self.o)
+
+    def board(self):
+        """
+        Returns a new list of lists board of the position.
+        """
+        return self.game.to_board(self.x, self.o)
+
+
+# Plain Tic Tac Toe, which the functions below play
+STANDARD = Game(3, 3, 3)
+
+FULL = STANDARD.full
+LINES = STANDARD.lines
+
+from_board = STANDARD.from_board
+to_board = STANDARD.to_board
+key = STANDARD.key
+player = STANDARD.player
+actions = STANDARD.actions
+result = STANDARD.result
+lined = STANDARD.lined
+winner = STANDARD.winner
+terminal = STANDARD.terminal
+utility = STANDARD.utility
+
+# Cells tried first by the search: the center, the corners, then the edges
+PREFERENCE = [4, 0, 2, 6, 8, 1, 3, 5, 7]
+
+# Kinds of value stored in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Positions already searched, mapping a position key to a triple
+# (value, bound, best cell). Every entry holds for its position
+# whatever search found it, so the table is kept between moves.
+transpositions = {}
+
+
+def best_move(x, o):
+    """
+    Returns the optimal cell for the player to move,
+    or None if the game is over.
+    """
+    if terminal(x, o):
+        return None
+    return negamax(x, o, -math.inf, math.inf)[1]
+
+
+def negamax(x, o, alpha, beta):
+    """
+    Returns (value, cell) for the player to move, searching with
+    alpha-beta pruning between `alpha` and `beta`.
+
+    The value is positive if the player to move can force a win, negative
+    if they lose, and 0 for a tie; faster wins and slower losses are worth
+    more, by the number of cells still empty when the game ends.
+    """
+    # Only the player who just moved can have completed a line
+    x_to_move = x.bit_count() == o.bit_count()
+    if lined(o if x_to_move else x):
+        return -1 - (FULL & ~(x | o)).bit_count(), None
+    if (x | o) == FULL:
+        return 0, None
+
+    position = key(x, o)
+    best_cell = None
+    entry = transpositions.get(position)
+    if entry is not None:
+        value, bound, best_cell = entry
+        if bound == EXACT:
+            return value, best_cell
+        if bound == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, best_cell
+
+    original_alpha = alpha
+    best_value = -math.inf
+    for cell in ordered_cells(x | o, best_cell):
+        if x_to_move:
+            value = -negamax(x | 1 << cell, o, -beta, -alpha)[0]
+        else:
+            value = -negamax(x, o | 1 << cell, -beta, -alpha)[0]
+
+        if value > best_value:
+            best_value = value
+            best_cell = cell
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    if best_value <= original_alpha:
+        bound = UPPER
+    elif best_value >= beta:
+        bound = LOWER
+    else:
+        bound = EXACT
+    transpositions[position] = (best_value, bound, best_cell)
+    return best_value, best_cell
+
+
+def ordered_cells(taken, first=None):
+    """
+    Returns the cells not in `taken`, `first` (if given) first,
+    then the center, the corners and the edges.
+    """
+    ordered = [first] if first is not None else []
+    for cell in PREFERENCE:
+        if not taken >> cell & 1 and cell != first:
+            ordered.append(cell)
+    return ordered
@@ -0,0 +1,231 @@
+"""
+Monte Carlo tree search for m,n,k games
+
+Grows a game tree one node per playout: UCT picks the path down the tree,
+one untried move is added at its end, and the game is played out from
+there with random moves on the bitboards. Every node on the path then
+counts the playout as a win, a tie or a loss for the player who moved
+into it. The move played is the root move visited most.
+
+With several workers, each grows its own tree from the same root with
+its share of the playouts, and their root visit counts are added up.
+With a seed and a playout budget, the move chosen is always the same.
+"""
+
+import math
+import os
+import random
+import time
+
+from bitboard import X, O
+from parallel import pool_context
+
+# Playouts per move when no budget is given
+PLAYOUTS = 2000
+
+# Weight of exploration against the win rate in UCT
+EXPLORATION = math.sqrt(2)
+
+# Outcome of a game that filled the board
+TIE = "tie"
+
+
+class Node():
+    """
+    Position in the search tree, with the number of playouts through it
+    and how many of them the player who moved into it won, ties counting
+    half.
+    """
+
+    __slots__ = ("position", "parent", "cell", "mover", "outcome",
+                 "children", "untried", "visits", "wins")
+
+    def __init__(self, position, parent=None, cell=None, rng=None):
+        self.position = position
+        self.parent = parent
+        self.cell = cell
+        self.mover = O if position.player() == X else X
+        self.outcome = outcome(position)
+        self.children = []
+        self.untried = [] if self.outcome else position.actions()
+        if rng is not None:
+            rng.shuffle(self.untried)
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        scale = EXPLORATION * math.sqrt(math.log(self.visits))
+        return max(self.children, key=lambda child: (
+            child.wins / child.visits + scale / math.sqrt(child.visits)
+        ))
+
+
+def outcome(position):
+    """
+    Returns X or O if that player has won the position, TIE if the board
+    is full, or None if the game goes on.
+    """
+    game, x, o, last = position.game, position.x, position.o, position.last
+    if last is not None:
+        if x >> last & 1 and game.lined_at(x, last):
+            return X
+        if o >> last & 1 and game.lined_at(o, last):
+            return O
+    else:
+        won = game.winner(x, o)
+        if won is not None:
+            return won
+    if (x | o) == game.full:
+        return TIE
+    return None
+
+
+def playout(position, rng):
+    """
+    Plays random moves from a position until the game ends
+    and returns its outcome.
+    """
+    game, x, o = position.game, position.x, position.o
+    free = game.actions(x, o)
+    rng.shuffle(free)
+    x_to_move = x.bit_count() == o.bit_count()
+    for cell in free:
+        if x_to_move:
+            x |= 1 << cell
+            if game.lined_at(x, cell):
+                return X
+        else:
+            o |= 1 << cell
+            if game.lined_at(o, cell):
+                return O
+        x_to_move = not x_to_move
+    return TIE
+
+
+def grow_tree(task):
+    """
+    Grows a tree from the root of a (position, playouts, seconds, seed)
+    task until either budget, if given, runs out.
+
+    Returns (visits, playouts, nodes), where `visits` maps every root
+    move to the number of playouts through it.
+    """
+    position, playouts, seconds, seed = task
+    rng = random.Random(seed)
+    deadline = math.inf if seconds is None else time.perf_counter() + seconds
+    root = Node(position, rng=rng)
+    nodes = 1
+    played = 0
+
+    while playouts is None or played < playouts:
+        if played % 64 == 0 and time.perf_counter() > deadline:
+            break
+
+        # Select a path down the tree, then expand one move at its end
+        node = root
+        while not node.untried and node.children:
+            node = node.select()
+        if node.untried:
+            cell = node.untried.pop()
+            child = Node(node.position.result(cell), node, cell, rng)
+            node.children.append(child)
+            node = child
+            nodes += 1
+
+        result = node.outcome or playout(node.position, rng)
+        played += 1
+
+        while node is not None:
+            node.visits += 1
+            if result == node.mover:
+                node.wins += 1
+            elif result == TIE:
+                node.wins += 0.5
+            node = node.parent
+
+    visits = {child.cell: child.visits for child in root.children}
+    return visits, played, nodes
+
+
+class MCTS():
+    """
+    Monte Carlo tree search of the positions of one game, stopping after
+    `playouts` playouts or `seconds` seconds, whichever comes first
+    (PLAYOUTS playouts if neither is given), and spread over `workers`
+    processes if that is not 1 (None for one per core).
+
+    Close it, or use it in a with statement, to stop its workers.
+    After `best_move`, `playouts` and `nodes` count what every move so
+    far has searched.
+    """
+
+    def __init__(self, game, playouts=None, seconds=None, seed=None,
+                 workers=1):
+        if playouts is None and seconds is None:
+            playouts = PLAYOUTS
+        self.game = game
+        self.budget = playouts
+        self.seconds = seconds
+        self.seed = seed
+        self.workers = workers
+        self.pool = None
+        self.playouts = 0
+        self.nodes = 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def tasks(self, position):
+        """
+        Returns one grow_tree task per worker, sharing out the playouts
+        and seeding each worker from the seed and the position.
+        """
+        count = self.workers or os.cpu_count() or 1
+        if count > 1 and self.pool is None:
+            self.pool = pool_context().Pool(count)
+        tasks = []
+        for i in range(count):
+            playouts = self.budget
+            if playouts is not None:
+                playouts = playouts // count + (i < playouts % count)
+            seed = None
+            if self.seed is not None:
+                seed = f"{self.seed}:{position.hash}:{i}"
+            tasks.append((position, playouts, self.seconds, seed))
+        return tasks
+
+    def best_move(self, position):
+        """
+        Returns the root move visited most, or None if the game is over.
+        Ties go to the lowest cell.
+        """
+        if position.terminal():
+            return None
+
+        tasks = self.tasks(position)
+        if self.pool is None:
+            results = map(grow_tree, tasks)
+        else:
+            results = self.pool.map(grow_tree, tasks, chunksize=1)
+
+        visits = {}
+        for counts, played, nodes in results:
+            self.playouts += played
+            self.nodes += nodes
+            for cell, count in counts.items():
+                visits[cell] = visits.get(cell, 0) + count
+        if not visits:
+            return position.actions()[0]
+        return max(sorted(visits), key=visits.__getitem__)
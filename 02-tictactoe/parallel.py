@@ -0,0 +1,140 @@
+"""
+Root-parallel search for m,n,k games
+
+Runs the iterative-deepening search of `search.Search` with the moves at
+the root split between worker processes. At every depth the move that
+looked best at the previous depth is searched first, on its own, and the
+value it gets is handed to the searches of all the other moves as their
+alpha bound, which they then search in parallel.
+
+Every worker process keeps one `Search` for all the tasks it runs, so
+its transposition table carries over from depth to depth and from move
+to move, as it does for a serial search. The results are merged in root
+order, not in the order workers finish, and every search gets the same
+bound whichever worker runs it.
+"""
+
+import math
+import multiprocessing
+import time
+
+from search import Search, Timeout, TIME_BUDGET, WIN
+
+
+def pool_context():
+    """
+    Returns a multiprocessing context that forks where the platform
+    allows it, so that workers start without importing anything again.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+# Search of this worker process, kept for every task it runs
+worker = None
+
+
+def start_worker(game):
+    """
+    Sets up the search of a worker process for the positions of `game`.
+    """
+    global worker
+    worker = Search(game)
+
+
+def search_move(task):
+    """
+    Searches one root move of a (position, cell, depth, alpha, seconds)
+    task within `seconds` and returns (value, nodes), where `value` is the
+    value of the move for the player to move, exact if it is above `alpha`
+    and an upper bound otherwise, or None if the time ran out.
+    """
+    global worker
+    position, cell, depth, alpha, seconds = task
+    if worker is None or worker.game != position.game:
+        start_worker(position.game)
+
+    # Each process times the search with its own clock
+    worker.deadline = time.perf_counter() + seconds
+    nodes = worker.nodes
+    try:
+        value, _ = worker.negamax(position.result(cell), depth - 1,
+                                  -math.inf, -alpha)
+    except Timeout:
+        return None, worker.nodes - nodes
+    return -value, worker.nodes - nodes
+
+
+class ParallelSearch():
+    """
+    Iterative-deepening search of the positions of one game with its root
+    moves spread over a pool of `workers` processes (one per core if
+    None). Close it, or use it in a with statement, to stop the pool.
+
+    After `best_move`, `depth`, `value` and `nodes` are as for `Search`.
+    """
+
+    def __init__(self, game, workers=None, seconds=TIME_BUDGET):
+        self.game = game
+        self.workers = workers
+        self.seconds = seconds
+        self.nodes = 0
+        self.depth = 0
+        self.value = 0
+        self.order = Search(game).order
+        self.pool = pool_context().Pool(workers, start_worker, (game,))
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def best_move(self, position):
+        """
+        Returns the best cell found for the player to move within the time
+        budget, or None if the game is over.
+        """
+        if position.terminal():
+            return None
+
+        deadline = time.perf_counter() + self.seconds
+        taken = position.x | position.o
+        cells = [cell for cell in self.order if not taken >> cell & 1]
+        best = cells[0]
+        for depth in range(1, len(cells) + 1):
+            first = cells[0]
+            remaining = deadline - time.perf_counter()
+            value, nodes = self.pool.apply(
+                search_move, ((position, first, depth, -math.inf, remaining),)
+            )
+            self.nodes += nodes
+            if value is None:
+                break
+
+            # Every other move is searched against the first one's value
+            remaining = deadline - time.perf_counter()
+            tasks = [(position, cell, depth, value, remaining)
+                     for cell in cells[1:]]
+            results = self.pool.map(search_move, tasks, chunksize=1)
+            self.nodes += sum(nodes for _, nodes in results)
+            if any(value is None for value, _ in results):
+                break
+
+            values = {first: value}
+            for cell, (bound, _) in zip(cells[1:], results):
+                values[cell] = max(bound, value)
+
+            # Only values above the first move's are exact, so moves that
+            # did not beat it keep their order, and the earliest move in
+            # root order with the highest value wins
+            cells.sort(key=lambda cell: -values[cell])
+            best, self.depth, self.value = cells[0], depth, values[cells[0]]
+            if abs(self.value) >= WIN:
+                break
+        return best
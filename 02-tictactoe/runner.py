@@ -4,6 +4,16 @@ import time
 
 import tictactoe as ttt
 
+# Board size and marks in a row to win: python runner.py [rows columns k]
+if len(sys.argv) not in (1, 4):
+    sys.exit("Usage: python runner.py [rows columns k]")
+if len(sys.argv) == 4:
+    try:
+        ttt.configure(*map(int, sys.argv[1:]))
+    except ValueError as e:
+        sys.exit(str(e))
+rows, columns = ttt.game.rows, ttt.game.columns
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,7 +25,10 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink to fit larger boards in the same space
+tile_size = min(80, 240 // max(rows, columns))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
@@ -67,13 +80,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (columns / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(columns):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -112,7 +124,7 @@ while True:
         if user != player and not game_over:
             if ai_turn:
                 time.sleep(0.5)
-                move = ttt.minimax(board)
+                move = ttt.minimax(board, workers=None)
                 board = ttt.result(board, move)
                 ai_turn = False
             else:
@@ -122,8 +134,8 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(columns):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -0,0 +1,185 @@
+"""
+Iterative-deepening search for m,n,k games
+
+Searches one move deeper at a time with negamax and alpha-beta pruning,
+until the game is solved or the time budget runs out, and then plays the
+best move of the deepest search that finished. Positions where a search
+stops before the game ends are scored by a heuristic evaluation.
+"""
+
+import math
+import time
+
+from bitboard import X, EXACT, LOWER, UPPER
+
+# Score of a won game, above any heuristic evaluation
+WIN = 1_000_000
+
+# Default time budget of one move, in seconds
+TIME_BUDGET = 1.0
+
+# Number of nodes searched between two looks at the clock
+CLOCK_INTERVAL = 256
+
+
+class Timeout(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+
+
+class Search():
+    """
+    Iterative-deepening negamax search of the positions of one game.
+
+    Positions are never changed, so searched values are stored under
+    their Zobrist hash and the same Search can be asked for every move
+    of a game, reusing what it found for the earlier ones.
+
+    After `best_move`, `depth` is the depth of the deepest search that
+    finished, `value` its value for the player to move, and `nodes` the
+    number of positions visited by all searches.
+    """
+
+    def __init__(self, game, seconds=TIME_BUDGET):
+        self.game = game
+        self.seconds = seconds
+        self.deadline = math.inf
+        self.nodes = 0
+        self.depth = 0
+        self.value = 0
+
+        # Position hash mapping to (depth, value, bound, best cell)
+        self.table = {}
+
+        # Position hash mapping to its heuristic evaluation
+        self.evaluations = {}
+
+        # Cells nearest the center first
+        middle_i, middle_j = (game.rows - 1) / 2, (game.columns - 1) / 2
+        self.order = sorted(range(game.size), key=lambda cell: (
+            abs(divmod(cell, game.columns)[0] - middle_i)
+            + abs(divmod(cell, game.columns)[1] - middle_j)
+        ))
+
+        # Score of a line holding only one side's marks, by their count
+        self.weights = [0] + [4 ** count for count in range(1, game.k + 1)]
+
+    def best_move(self, position):
+        """
+        Returns the best cell found for the player to move within the time
+        budget, or None if the game is over.
+        """
+        if position.terminal():
+            return None
+
+        self.deadline = time.perf_counter() + self.seconds
+        taken = position.x | position.o
+        best = self.ordered_cells(taken)[0]
+        empty = (self.game.full & ~taken).bit_count()
+        for depth in range(1, empty + 1):
+            try:
+                value, cell = self.negamax(position, depth,
+                                           -math.inf, math.inf)
+            except Timeout:
+                break
+            best, self.depth, self.value = cell, depth, value
+
+            # A forced win or loss stays so however deep the search goes
+            if abs(value) >= WIN:
+                break
+        return best
+
+    def negamax(self, position, depth, alpha, beta):
+        """
+        Returns (value, cell) for the player to move, searching `depth`
+        moves ahead with alpha-beta pruning between `alpha` and `beta`.
+        """
+        self.nodes += 1
+        if (self.nodes % CLOCK_INTERVAL == 0
+                and time.perf_counter() > self.deadline):
+            raise Timeout
+
+        game = self.game
+        x, o, last = position.x, position.o, position.last
+        taken = x | o
+
+        # Only the player who marked the last cell can have just won
+        if last is not None and game.lined_at(
+                x if x >> last & 1 else o, last):
+            return -WIN - (game.full & ~taken).bit_count(), None
+        if taken == game.full:
+            return 0, None
+        if depth == 0:
+            return self.evaluate(position), None
+
+        key = position.hash
+        best_cell = None
+        entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, value, bound, best_cell = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return value, best_cell
+                if bound == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, best_cell
+
+        original_alpha = alpha
+        best_value = -math.inf
+        for cell in self.ordered_cells(taken, best_cell):
+            value = -self.negamax(position.result(cell), depth - 1,
+                                  -beta, -alpha)[0]
+            if value > best_value:
+                best_value = value
+                best_cell = cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            bound = UPPER
+        elif best_value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table[key] = (depth, best_value, bound, best_cell)
+        return best_value, best_cell
+
+    def ordered_cells(self, taken, first=None):
+        """
+        Returns the cells not in `taken`, `first` (if given) first,
+        then the cells nearest the center.
+        """
+        ordered = [first] if first is not None else []
+        for cell in self.order:
+            if not taken >> cell & 1 and cell != first:
+                ordered.append(cell)
+        return ordered
+
+    def evaluate(self, position):
+        """
+        Returns a heuristic value of a position that is not over for the
+        player to move: every line still open to only one side counts for
+        that side, more the more of its cells are marked.
+        """
+        score = self.evaluations.get(position.hash)
+        if score is not None:
+            return score
+
+        if position.player() == X:
+            mine, theirs = position.x, position.o
+        else:
+            mine, theirs = position.o, position.x
+        weights = self.weights
+        score = 0
+        for line in self.game.lines:
+            if not theirs & line:
+                score += weights[(mine & line).bit_count()]
+            elif not mine & line:
+                score -= weights[(theirs & line).bit_count()]
+        self.evaluations[position.hash] = score
+        return score
@@ -0,0 +1,172 @@
+"""
+Perfect-play table for Tic Tac Toe
+
+Holds the value and an optimal cell of every reachable position that is
+not over, so that the best move is found with one dictionary lookup
+instead of a search. Positions that are rotations or reflections of each
+other share one entry, stored under the smallest key among them.
+
+Build the table with:
+
+    python table.py
+
+which writes it next to this file. If the file is missing, `best_move`
+solves the positions in memory the first time it is called.
+"""
+
+import math
+import os
+import sys
+
+from array import array
+
+import bitboard
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                    "tictactoe.table")
+
+MAGIC = b"TTTTABLE"
+
+
+def symmetries():
+    """
+    Returns the eight symmetries of the board as lists mapping
+    each cell to its image.
+    """
+    def rotate(cell):
+        i, j = divmod(cell, 3)
+        return 3 * j + (2 - i)
+
+    def reflect(cell):
+        i, j = divmod(cell, 3)
+        return 3 * i + (2 - j)
+
+    found = []
+    for reflected in (False, True):
+        mapping = [reflect(cell) if reflected else cell for cell in range(9)]
+        for _ in range(4):
+            found.append(mapping)
+            mapping = [rotate(cell) for cell in mapping]
+    return found
+
+
+SYMMETRIES = symmetries()
+
+# Inverse of every symmetry, mapping an image back to its cell
+INVERSES = [
+    [mapping.index(cell) for cell in range(9)] for mapping in SYMMETRIES
+]
+
+# Image of every 9-bit mask under every symmetry
+IMAGES = [
+    [sum(1 << mapping[cell] for cell in range(9) if mask >> cell & 1)
+     for mask in range(bitboard.FULL + 1)]
+    for mapping in SYMMETRIES
+]
+
+# Canonical position key mapping to (value, cell), loaded on first use
+entries = None
+
+
+def canonical(x, o):
+    """
+    Returns (key, symmetry) for the smallest key among the images of the
+    position, and the index of a symmetry mapping the position to it.
+    """
+    best = None
+    for symmetry, images in enumerate(IMAGES):
+        candidate = bitboard.key(images[x], images[o])
+        if best is None or candidate < best[0]:
+            best = (candidate, symmetry)
+    return best
+
+
+def solve():
+    """
+    Returns a dictionary mapping the canonical key of every reachable
+    position that is not over to its value for the player to move and
+    an optimal cell, in canonical orientation.
+    """
+    solved = {}
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        if bitboard.terminal(x, o):
+            continue
+        key, symmetry = canonical(x, o)
+        if key in solved:
+            continue
+        images = IMAGES[symmetry]
+        value, cell = bitboard.negamax(images[x], images[o],
+                                       -math.inf, math.inf)
+        solved[key] = (value, cell)
+        for move in bitboard.actions(x, o):
+            stack.append(bitboard.result(x, o, move))
+    return solved
+
+
+def save(solved, path=PATH):
+    """
+    Writes a solved table to `path` as the sorted keys followed by
+    one value byte and one cell byte per key.
+    """
+    keys = array("i", sorted(solved))
+    values = array("b", (solved[key][0] for key in keys))
+    cells = array("b", (solved[key][1] for key in keys))
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(keys).to_bytes(4, "little"))
+        if sys.byteorder != "little":
+            keys.byteswap()
+        f.write(keys.tobytes())
+        f.write(values.tobytes())
+        f.write(cells.tobytes())
+
+
+def load(path=PATH):
+    """
+    Returns the table saved at `path`,
+    or None if there is none that can be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+
+    count = int.from_bytes(data[len(MAGIC):len(MAGIC) + 4], "little")
+    start = len(MAGIC) + 4
+    keys = array("i")
+    keys.frombytes(data[start:start + 4 * count])
+    if sys.byteorder != "little":
+        keys.byteswap()
+    values = array("b", data[start + 4 * count:start + 5 * count])
+    cells = array("b", data[start + 5 * count:start + 6 * count])
+    if len(cells) != count:
+        return None
+    return {key: (values[i], cells[i]) for i, key in enumerate(keys)}
+
+
+def best_move(x, o):
+    """
+    Returns an optimal cell for the player to move in a position that is
+    not over, loading the table on first use.
+
+    Raises KeyError if the position cannot be reached in a game.
+    """
+    global entries
+
+    if entries is None:
+        entries = load()
+        if entries is None:
+            entries = solve()
+    key, symmetry = canonical(x, o)
+    return INVERSES[symmetry][entries[key][1]]
+
+
+if __name__ == "__main__":
+    solved = solve()
+    save(solved)
+    print(f"{len(solved)} positions written to {PATH}")
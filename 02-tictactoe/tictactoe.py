@@ -2,190 +2,159 @@
 Tic Tac Toe Player
 """
 
-import math
 import copy
-import random
+import os
+
+import bitboard
+import mcts
+import parallel
+import search
+import table
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Rules of the game being played, set with configure
+game = bitboard.STANDARD
+
+# Search kept for the moves of one game on a board other than the standard
+engine = None
+engine_workers = 1
+
+
+def configure(rows=3, columns=3, k=3):
+    """
+    Sets the size of the board and how many marks in a row win.
+    """
+    global game
+    if (rows, columns, k) == (3, 3, 3):
+        game = bitboard.STANDARD
+    else:
+        game = bitboard.Game(rows, columns, k)
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    close_engine()
+    return [[EMPTY] * game.columns for _ in range(game.rows)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    count_x = 0
-    count_o = 0
-    for row in board:
-        count_x += row.count(X)
-        count_o += row.count(O)
-
-    if count_x > count_o:
-        return O
-
-    return X
+    return game.player(*game.from_board(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    available_actions = []
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] is None:
-                available_actions.append( (i, j) )
-    return available_actions
+    x, o = game.from_board(board)
+    return [game.action(cell) for cell in game.actions(x, o)]
 
 
 def result(board, action):
     """
-    Returns the board that results from making move (i, j) on the board.
+    Returns the board that results from making move (i, j) on the board,
+    leaving the board itself unchanged.
     """
     if action is None:
-        return board
+        return copy.deepcopy(board)
 
-    if board[action[0]][action[1]] is not None:
+    i, j = action
+    if not (0 <= i < game.rows and 0 <= j < game.columns) \
+            or board[i][j] is not None:
         raise Exception('Action not allowed')
 
-    mark = player(board)
-    board[action[0]][action[1]] = mark
-    return board
+    new_board = copy.deepcopy(board)
+    new_board[i][j] = player(board)
+    return new_board
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    if terminal(board):
-        return three_on_line(board)
-
-    return None
+    return game.winner(*game.from_board(board))
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if three_on_line(board) is not None:
-        return True
-
-    # validate board it's not full
-    full = True
-    for row in board:
-        if row.count(EMPTY) > 0:
-            full = False
-
-    return full
+    return game.terminal(*game.from_board(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if terminal( board ):
-        aux = winner( board )
-
-        if aux is None:
-            return 0
-        elif aux == X:
-            return 1
-        else:
-            return -1
-    else:
-        return 0
+    return game.utility(*game.from_board(board))
 
 
 def three_on_line(board):
     """
     Return who done 3 on line
     """
-    # validate all rows
-    for row in board:
-        if row.count(X) == 3:
-            return X
-        if row.count(O) == 3:
-            return O
-
-    # validate all columns
-    for i in range(3):
-        if board[1][i] is not None and board[0][i] == board[1][i] == board[2][i]:
-            return board[1][i]
+    return game.winner(*game.from_board(board))
 
-    # validate diagonal
-    if board[1][1] is not None:
-        if board[0][0] == board[1][1] == board[2][2]:
-            return board[1][1]
-        if board[0][2] == board[1][1] == board[2][0]:
-            return board[1][1]
 
-
-def minimax(board):
+def minimax(board, seconds=search.TIME_BUDGET, workers=1):
     """
     Returns the optimal action for the current player on the board.
-    """
-    ia_player = player(board)
-    is_maximizing = False
-    evaluate = math.inf
-    test = -10
-    if ia_player == X:
-        is_maximizing = True
-        evaluate = -math.inf
-        test = 10
-
-    for current_action in actions(board):
-        board = result(board, current_action)
-        score = evaluate_minimax(board, is_maximizing, test)
-        board[current_action[0]][current_action[1]] = EMPTY
-
-        print(current_action, score)
-
-        if ia_player == X:
-            if score > evaluate:
-                evaluate = score
-                best_movement = current_action
-            elif score == 1:
-                evaluate = score
-                best_movement = current_action
-        else:
-            if score < evaluate:
-                evaluate = score
-                best_movement = current_action
-
-    print( 'best movement', best_movement, score)
-
-    return best_movement
-
-
-def evaluate_minimax(board, is_maximizing, memory):
-
-    if terminal(board):
-        return utility(board)
-
-    available_actions = actions(board)
-    scores = []
-    for current_action in available_actions:
-        board = result(board, current_action)
-        if is_maximizing:
-            scores.append( max(-math.inf, evaluate_minimax(board, not is_maximizing, memory)) )
-        else:
-            scores.append( min(math.inf, evaluate_minimax(board, not is_maximizing, memory)) )
-        board[current_action[0]][current_action[1]] = EMPTY
-
-    if is_maximizing:
-        return memory + max( scores )
-    else:
-        return memory + min( scores )
-
-
 
+    On the standard board, reachable positions are looked up in the
+    perfect-play table and anything else is searched to the end. Other
+    boards get the best action an iterative-deepening search finds
+    within `seconds`, spread over `workers` processes (None for one per
+    core) if that comes to more than one.
+    """
+    global engine, engine_workers
+
+    x, o = game.from_board(board)
+    if game.terminal(x, o):
+        return None
+    if game is not bitboard.STANDARD:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if engine is None or engine.game != game or engine_workers != workers:
+            close_engine()
+            if workers <= 1:
+                engine = search.Search(game)
+            else:
+                engine = parallel.ParallelSearch(game, workers)
+            engine_workers = workers
+        engine.seconds = seconds
+        return game.action(engine.best_move(game.position(x, o)))
+    try:
+        cell = table.best_move(x, o)
+    except KeyError:
+        cell = bitboard.best_move(x, o)
+    return game.action(cell)
+
+
+def monte_carlo(board, playouts=None, seconds=None, seed=None, workers=1):
+    """
+    Returns the action Monte Carlo tree search picks for the current player
+    on the board, within `playouts` playouts or `seconds` seconds (see
+    `mcts.MCTS`). The same seed and playouts always give the same action.
+    """
+    x, o = game.from_board(board)
+    if game.terminal(x, o):
+        return None
+    with mcts.MCTS(game, playouts, seconds, seed, workers) as searcher:
+        return game.action(searcher.best_move(game.position(x, o)))
+
+
+def close_engine():
+    """
+    Drops the search kept between moves, stopping its workers if any.
+    """
+    global engine
+    if isinstance(engine, parallel.ParallelSearch):
+        engine.close()
+    engine = None
@@ -1,5 +1,7 @@
 import itertools
 
+from array import array
+
 
 class Sentence():
 
@@ -15,6 +17,17 @@ class Sentence():
         """Returns a set of all symbols in the logical sentence."""
         return set()
 
+    def to_cnf(self, cnf=None):
+        """Returns a CNF asserting the sentence, or adds it to `cnf`."""
+        if cnf is None:
+            cnf = CNF()
+        cnf.add(self)
+        return cnf
+
+    def encode(self, cnf):
+        """Adds Tseitin clauses for the sentence, returns its literal."""
+        raise Exception("nothing to encode")
+
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
@@ -68,6 +81,9 @@ class Symbol(Sentence):
     def symbols(self):
         return {self.name}
 
+    def encode(self, cnf):
+        return cnf.variable(self.name)
+
 
 class Not(Sentence):
     def __init__(self, operand):
@@ -92,6 +108,9 @@ class Not(Sentence):
     def symbols(self):
         return self.operand.symbols()
 
+    def encode(self, cnf):
+        return -cnf.literal(self.operand)
+
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -129,6 +148,14 @@ class And(Sentence):
     def symbols(self):
         return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
+    def encode(self, cnf):
+        literals = [cnf.literal(conjunct) for conjunct in self.conjuncts]
+        a = cnf.new_variable()
+        for literal in literals:
+            cnf.clauses.append([-a, literal])
+        cnf.clauses.append([a] + [-literal for literal in literals])
+        return a
+
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
@@ -160,6 +187,14 @@ class Or(Sentence):
     def symbols(self):
         return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
+    def encode(self, cnf):
+        literals = [cnf.literal(disjunct) for disjunct in self.disjuncts]
+        a = cnf.new_variable()
+        for literal in literals:
+            cnf.clauses.append([a, -literal])
+        cnf.clauses.append([-a] + literals)
+        return a
+
 
 class Implication(Sentence):
     def __init__(self, antecedent, consequent):
@@ -191,6 +226,13 @@ class Implication(Sentence):
     def symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
+    def encode(self, cnf):
+        p = cnf.literal(self.antecedent)
+        q = cnf.literal(self.consequent)
+        a = cnf.new_variable()
+        cnf.clauses.extend([[-a, -p, q], [a, p], [a, -q]])
+        return a
+
 
 class Biconditional(Sentence):
     def __init__(self, left, right):
@@ -224,6 +266,68 @@ class Biconditional(Sentence):
     def symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
 
+    def encode(self, cnf):
+        p = cnf.literal(self.left)
+        q = cnf.literal(self.right)
+        a = cnf.new_variable()
+        cnf.clauses.extend([[-a, -p, q], [-a, p, -q], [a, p, q], [a, -p, -q]])
+        return a
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form, as lists of integer literals:
+    variable `v` is true for literal `v` and false for literal `-v`.
+
+    `symbols` maps symbol names to their variables. Every other variable
+    is introduced by the Tseitin encoding to stand for a subsentence, so
+    the clauses grow linearly with the sentences added, and a sentence
+    object that occurs more than once is encoded once.
+    """
+
+    def __init__(self):
+        self.symbols = {}
+        self.count = 0
+        self.clauses = []
+
+        # Literals of the sentences encoded so far, by object identity,
+        # with the sentences themselves so their ids are not reused
+        self.encoded = {}
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, numbering new ones."""
+        if name not in self.symbols:
+            self.symbols[name] = self.new_variable()
+        return self.symbols[name]
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def literal(self, sentence):
+        """Returns the literal equivalent to a sentence, encoding it once."""
+        Sentence.validate(sentence)
+        if id(sentence) not in self.encoded:
+            self.encoded[id(sentence)] = (sentence.encode(self), sentence)
+        return self.encoded[id(sentence)][0]
+
+    def add(self, sentence, positive=True):
+        """Asserts a sentence, or its negation if `positive` is false."""
+        literal = self.literal(sentence)
+        self.clauses.append([literal if positive else -literal])
+
+    def flatten(self):
+        """
+        Returns (literals, offsets) arrays holding clause `i` in
+        literals[offsets[i]:offsets[i + 1]].
+        """
+        literals = array("i")
+        offsets = array("i", [0])
+        for clause in self.clauses:
+            literals.extend(clause)
+            offsets.append(len(literals))
+        return literals, offsets
+
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
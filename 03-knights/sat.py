@@ -0,0 +1,247 @@
+"""
+SAT-based entailment for logic sentences.
+
+`model_check` answers the same question as `logic.model_check`, whether a
+knowledge base entails a query, by asking a CDCL solver whether the
+knowledge base together with the negated query has a model. Both are
+turned into clauses by the Tseitin encoding of `logic.CNF`.
+"""
+
+from logic import CNF
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(query, positive=False)
+    solver = Solver(cnf.count)
+    literals, offsets = cnf.flatten()
+    for i in range(len(offsets) - 1):
+        solver.add_clause(literals[offsets[i]:offsets[i + 1]])
+    return not solver.solve()
+
+
+class Solver():
+    """
+    Conflict-driven clause learning SAT solver over variables 1 to `count`.
+
+    Each clause watches its first two literals, so assigning a literal only
+    visits the clauses watching its negation. Every conflict is analysed
+    back to its first unique implication point, the resulting clause is
+    learned, and the search jumps back to the level where that clause
+    becomes unit. Decisions pick the unassigned variable most involved in
+    recent conflicts.
+    """
+
+    def __init__(self, count):
+        self.count = count
+
+        # Assignment of every variable: 1 true, -1 false, 0 unassigned,
+        # with the decision level and the clause that implied it
+        self.values = [0] * (count + 1)
+        self.levels = [0] * (count + 1)
+        self.reasons = [None] * (count + 1)
+
+        # Last value of every variable, tried again when deciding on it
+        self.phases = [-1] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+
+        # Assigned literals in order, where each decision level starts,
+        # and how far the assignments have been propagated
+        self.trail = []
+        self.limits = []
+        self.head = 0
+
+        self.clauses = []
+        self.watches = {}
+        self.unsatisfiable = False
+        self.conflicts = 0
+
+    def value(self, literal):
+        """Returns 1 if the literal is true, -1 if false, 0 if unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """Adds a clause of integer literals before solving."""
+        clause = []
+        for literal in literals:
+            if -literal in clause:
+                return
+            if literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            value = self.value(clause[0])
+            if value == -1:
+                self.unsatisfiable = True
+            elif value == 0:
+                self.assign(clause[0], None)
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        """Stores a clause and watches its first two literals."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches.setdefault(clause[0], []).append(index)
+        self.watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a unit clause.
+        Returns the index of a clause made false, or None.
+        """
+        clauses, watches, value = self.clauses, self.watches, self.value
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches.get(false, [])
+            kept = []
+            for position, index in enumerate(watching):
+                clause = clauses[index]
+
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                if value(clause[0]) == 1:
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    if value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], false
+                        watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if value(clause[0]) == -1:
+                        kept.extend(watching[position + 1:])
+                        watches[false] = kept
+                        return index
+                    self.assign(clause[0], index)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, its asserting literal
+        first, and the level to jump back to.
+        """
+        level = len(self.limits)
+        learned = [None]
+        seen = set()
+        pending = 0
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for literal in clause:
+                variable = abs(literal)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(literal)
+
+            # Walk back to the latest assignment involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal assigned last after the asserting one
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+
+    def backtrack(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        best = None
+        for variable in range(1, self.count + 1):
+            if self.values[variable] == 0 and (
+                best is None or self.activity[variable] > self.activity[best]
+            ):
+                best = variable
+        return best
+
+    def solve(self):
+        """Returns True if the clauses have a model, False otherwise."""
+        if self.unsatisfiable:
+            return False
+        restart = 100
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.unsatisfiable = True
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.watch(learned))
+                self.increment /= 0.95
+
+                # Restart now and then, keeping the learned clauses
+                if self.conflicts >= restart:
+                    restart = int(restart * 1.5) + self.conflicts
+                    self.backtrack(0)
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(variable * self.phases[variable], None)
+
+    def model(self):
+        """Returns the value of every variable after a successful solve."""
+        return {variable: self.values[variable] == 1
+                for variable in range(1, self.count + 1)}